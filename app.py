@@ -55,13 +55,38 @@ with app.app_context():
     import models
     db.create_all()
     
-    # Start scheduler
+    # Add columns and indexes introduced after the tables were created
+    from services.schema_service import SchemaService
+    SchemaService().upgrade()
+    
+    # Create the full-text product search index
+    from services.search_service import SearchService
+    SearchService().ensure_index()
+    
+    # Keep per-category product counts up to date
+    from services.facet_service import FacetService
+    FacetService().ensure_counts()
+    
+    # Start scheduler; only the process holding the scheduler lease runs jobs
     try:
-        scheduler.start()
+        from services.scheduler_leader import scheduler_leader
+        scheduler_leader.start()
         logger.info("Scheduler started successfully")
     except Exception as e:
         logger.error(f"Failed to start scheduler: {e}")
 
+    # Publish queued posts in the background
+    from services.post_dispatcher import post_dispatcher
+    post_dispatcher.schedule()
+
+    # Refresh engagement of published posts, most often for the freshest
+    from services.engagement_poller import engagement_poller
+    engagement_poller.schedule()
+
+    # Refresh prices, discounts and status of stored products from the Shopee API
+    from services.shopee_service import ShopeeService
+    ShopeeService().schedule_delta_sync()
+
 # Shut down scheduler when exiting the app
 atexit.register(lambda: scheduler.shutdown())
 
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Shopee Affiliate Marketing System
+Times the service and route hot paths against generated datasets and fails
+when a benchmark regresses beyond the threshold against stored baselines.
+
+Usage:
+    python benchmarks/run_benchmarks.py                     # compare small and medium to baselines
+    python benchmarks/run_benchmarks.py --sizes large       # 1M products, 10M posts
+    python benchmarks/run_benchmarks.py --update-baselines  # record the current numbers
+
+Each size runs in its own process with a fresh SQLite database (or the one
+given with --database-url), the Shopee API stub server and no social media
+credentials, so nothing leaves the machine. Baselines are only comparable on
+the machine that recorded them; on a quiet dedicated machine a lower
+--threshold catches smaller regressions.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARKS_DIR)
+BASELINES_PATH = os.path.join(BENCHMARKS_DIR, 'baselines.json')
+
+BENCHMARK_SIZES = {
+    'small': {'products': 2000, 'posts': 10000},
+    'medium': {'products': 50000, 'posts': 250000},
+    'large': {'products': 1000000, 'posts': 10000000},
+}
+DEFAULT_SIZES = ['small', 'medium']
+DEFAULT_REPEAT = 7
+# Runs are compared by their best time, which is far less noisy than the median;
+# a benchmark regresses when it is this much slower than the baseline...
+DEFAULT_THRESHOLD = 0.5
+# ...and by more than this, so sub-millisecond jitter never fails a run
+NOISE_FLOOR_MS = 2.0
+BENCHMARK_SEED = 42
+
+SOCIAL_CREDENTIALS = [
+    'INSTAGRAM_USERNAME', 'INSTAGRAM_PASSWORD', 'TWITTER_API_KEY', 'TWITTER_API_SECRET',
+    'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET'
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES), help=f"comma separated, from {', '.join(BENCHMARK_SIZES)}")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('--database-url', help="benchmark against this database instead of a temporary SQLite file")
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--update-baselines', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def time_benchmark(function, repeat):
+    """Median and best wall time in milliseconds, after one warm-up run"""
+    function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': round(statistics.median(timings), 3), 'min_ms': round(min(timings), 3)}
+
+def prepare_environment(size, workdir, database_url):
+    """Point the app at a benchmark database and a local Shopee API stub"""
+    from shopee_stub_server import create_server
+    
+    stub = create_server(port=0, items=max(BENCHMARK_SIZES[size]['products'], 1000), seed=BENCHMARK_SEED)
+    stub.start_in_thread()
+    
+    for name in SOCIAL_CREDENTIALS:
+        os.environ.pop(name, None)
+    os.environ.update({
+        'DATABASE_URL': database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        'SHOPEE_API_BASE_URL': stub.url,
+        'SHOPEE_PARTNER_ID': stub.partner_id,
+        'SHOPEE_PARTNER_KEY': stub.partner_key,
+        'SHOPEE_ACCESS_TOKEN': stub.access_token,
+        'SHOPEE_SHOP_ID': stub.shop_id,
+        'SHOPEE_API_CACHE_PATH': os.path.join(workdir, 'shopee_api_cache.db'),
+        'SHOPEE_API_RATE_LIMIT': '100000',
+        'SHOPEE_API_BURST': '1000',
+    })
+    return stub
+
+def load_dataset(size):
+    import generate_benchmark_data
+    from app import app, db
+    from models import ScheduleConfig, SocialMediaAccount
+    
+    counts = BENCHMARK_SIZES[size]
+    generate_benchmark_data.generate_benchmark_data(SimpleNamespace(
+        products=counts['products'], posts=counts['posts'], days=365, inactive_share=0.05,
+        seed=BENCHMARK_SEED, now=None, batch_size=10000, truncate=True
+    ))
+    
+    with app.app_context():
+        for platform_name in generate_benchmark_data.PLATFORMS:
+            if not SocialMediaAccount.query.filter_by(platform=platform_name).first():
+                db.session.add(SocialMediaAccount(platform=platform_name, username='benchmark', is_active=True))
+        # The daily limit would turn create_scheduled_post into a no-op after a few runs
+        ScheduleConfig.query.update({'max_posts_per_day': 10 ** 9})
+        db.session.commit()
+
+def build_benchmarks():
+    """Ordered (name, function) pairs; functions run inside an app context"""
+    from app import app
+    from models import Product
+    from services.analytics_service import AnalyticsService
+    from services.scheduler_service import SchedulerService
+    from services.shopee_service import ShopeeService
+    from services.social_media_service import SocialMediaService
+    
+    shopee_service = ShopeeService()
+    social_media_service = SocialMediaService()
+    scheduler_service = SchedulerService()
+    analytics_service = AnalyticsService()
+    client = app.test_client()
+    
+    products = Product.query.filter_by(is_active=True).order_by(Product.id).limit(1000).all()
+    today = datetime.now().date()
+    
+    def generate_post_contents():
+        for product in products:
+            for platform_name in ('instagram', 'twitter', 'facebook'):
+                social_media_service.generate_post_content(product, platform_name)
+    
+    def get(path):
+        def request_route():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        return request_route
+    
+    return [
+        ('shopee.fetch_simulated_products', lambda: shopee_service.fetch_simulated_products(20)),
+        ('shopee.fetch_real_shopee_products', lambda: shopee_service.fetch_real_shopee_products(20, force_refresh=True)),
+        ('shopee.get_product_details_100', lambda: shopee_service.get_product_details(
+            [1000000 + n for n in range(100)], force_refresh=True)),
+        ('social.generate_post_content_x3000', generate_post_contents),
+        ('scheduler.create_scheduled_post', lambda: scheduler_service.create_scheduled_post('instagram')),
+        ('analytics.update_daily_analytics', lambda: analytics_service.update_daily_analytics(today - timedelta(days=1))),
+        ('analytics.get_summary_stats_30d', lambda: analytics_service.get_summary_stats(today - timedelta(days=30), today)),
+        ('analytics.generate_performance_report_30d', lambda: analytics_service.generate_performance_report(30)),
+        ('route.dashboard', get('/')),
+        ('route.products', get('/products')),
+        ('route.products_search', get('/products?search=fone')),
+        ('route.products_category_page', get('/products?category=Pets&page=5')),
+        ('route.history', get('/history')),
+        ('route.history_filtered_page', get('/history?platform=twitter&status=posted&page=50')),
+        ('route.analytics_30d', get('/analytics?days=30')),
+    ]
+
+def run_worker(args):
+    """Generate one dataset size and time every benchmark against it"""
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, PROJECT_DIR)
+    
+    with tempfile.TemporaryDirectory(prefix='shopee-benchmark-') as workdir:
+        stub = prepare_environment(args.worker, workdir, args.database_url)
+        load_dataset(args.worker)
+        
+        from app import app
+        results = {}
+        with app.app_context():
+            for name, function in build_benchmarks():
+                if args.filter and args.filter not in name:
+                    continue
+                results[name] = time_benchmark(function, args.repeat)
+                print(f"  {name}: best {results[name]['min_ms']:.1f} ms, median {results[name]['median_ms']:.1f} ms", flush=True)
+        
+        stub.shutdown()
+    
+    with open(args.output, 'w') as f:
+        json.dump(results, f)
+    return 0
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {'sizes': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def compare(size, results, baselines, threshold):
+    """Print a result table and return the names of regressed benchmarks"""
+    regressions = []
+    print(f"\n{'benchmark':<44}{'baseline':>12}{'best':>12}{'change':>10}")
+    for name, result in results.items():
+        baseline = baselines.get('sizes', {}).get(size, {}).get(name)
+        best = result['min_ms']
+        if baseline is None:
+            print(f"{name:<44}{'-':>12}{best:>10.1f}ms{'new':>10}")
+            continue
+        
+        change = (best - baseline) / baseline if baseline else 0.0
+        regressed = change > threshold and best - baseline > NOISE_FLOOR_MS
+        marker = '  REGRESSION' if regressed else ''
+        print(f"{name:<44}{baseline:>10.1f}ms{best:>10.1f}ms{change:>+10.0%}{marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def run_suite(args):
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in BENCHMARK_SIZES]
+    if unknown:
+        print(f"Unknown sizes: {', '.join(unknown)}")
+        return 2
+    
+    baselines = load_baselines(args.baselines)
+    regressions = []
+    all_results = {}
+    
+    for size in sizes:
+        print(f"🚀 Benchmarking {size} dataset ({BENCHMARK_SIZES[size]['products']} products, {BENCHMARK_SIZES[size]['posts']} posts)")
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as output:
+            output_path = output.name
+        
+        command = [sys.executable, os.path.abspath(__file__), '--worker', size, '--output', output_path,
+                   '--repeat', str(args.repeat), '--filter', args.filter]
+        if args.database_url:
+            command += ['--database-url', args.database_url]
+        
+        try:
+            completed = subprocess.run(command, cwd=PROJECT_DIR)
+            if completed.returncode != 0:
+                print(f"❌ Benchmark worker for {size} failed with exit code {completed.returncode}")
+                return completed.returncode
+            with open(output_path) as f:
+                all_results[size] = json.load(f)
+        finally:
+            os.unlink(output_path)
+        
+        regressions += [f"{size}/{name}" for name in compare(size, all_results[size], baselines, args.threshold)]
+    
+    if args.update_baselines:
+        for size, results in all_results.items():
+            baselines.setdefault('sizes', {}).setdefault(size, {}).update(
+                {name: result['min_ms'] for name, result in results.items()}
+            )
+        baselines['recorded_on'] = {
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+        }
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\n✓ Baselines written to {args.baselines}")
+        return 0
+    
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    
+    print("\n✓ No regressions")
+    return 0
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    sys.exit(run_worker(arguments) if arguments.worker else run_suite(arguments))
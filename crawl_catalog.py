@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Full Shopee catalog crawl for Shopee Affiliate Marketing System
+Stores every item of the shop, saving its progress after each page
+
+Usage:
+    python crawl_catalog.py              # start, or resume an interrupted crawl
+    python crawl_catalog.py --restart    # start over from the first page
+
+The offset reached is kept in the catalog_crawl sync checkpoint, so a
+crawl that stops halfway continues from that page when run again.
+"""
+
+import argparse
+import os
+import sys
+
+# A crawl runs next to the web workers and must never take the scheduler lease
+os.environ["SCHEDULER_MODE"] = "follower"
+
+from app import app
+from services.shopee_service import ShopeeService, ITEM_LIST_PAGE_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the full Shopee catalog")
+    parser.add_argument('--restart', action='store_true', help="Start over instead of resuming from the saved offset")
+    parser.add_argument('--force-refresh', action='store_true', help="Bypass the API response cache")
+    parser.add_argument('--page-size', type=int, default=ITEM_LIST_PAGE_SIZE, help=f"items per page, at most {ITEM_LIST_PAGE_SIZE}")
+    args = parser.parse_args()
+    if not 1 <= args.page_size <= ITEM_LIST_PAGE_SIZE:
+        parser.error(f"--page-size must be between 1 and {ITEM_LIST_PAGE_SIZE}")
+    
+    with app.app_context():
+        shopee_service = ShopeeService()
+        if not shopee_service.use_real_api:
+            print("✗ Configure the Shopee API credentials to crawl the catalog")
+            return 1
+        
+        stats = shopee_service.crawl_full_catalog(
+            page_size=args.page_size, force_refresh=args.force_refresh, restart=args.restart
+        )
+        print(f"✓ {stats['items']} items in {stats['pages']} pages: "
+              f"{stats['inserted']} new, {stats['updated']} updated, {stats['unchanged']} unchanged")
+        
+        if not stats['finished']:
+            offset = shopee_service.get_checkpoint("catalog_crawl").offset
+            print(f"✗ Crawl stopped at offset {offset or 0}, run again to resume")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark data generator for Shopee Affiliate Marketing System
+Bulk-loads a reproducible catalog, post history, analytics and schedules
+
+Usage:
+    python generate_benchmark_data.py --products 1000000 --posts 10000000 \\
+        --database-url sqlite:///benchmark.db --seed 42
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+PLATFORMS = ['instagram', 'twitter', 'facebook']
+CATEGORIES = [
+    'Eletrônicos', 'Moda Feminina', 'Moda Masculina', 'Casa e Jardim',
+    'Beleza e Cuidados', 'Esportes', 'Livros e Hobbies', 'Brinquedos',
+    'Automóveis', 'Saúde', 'Comida e Bebidas', 'Pets'
+]
+PRODUCT_NAMES = [
+    'Fone de Ouvido Bluetooth', 'Smartwatch Fitness', 'Tênis Esportivo', 'Vestido Floral',
+    'Camisa Social', 'Panela Antiaderente', 'Kit Skincare', 'Suporte para Notebook',
+    'Caixa de Som Portátil', 'Mochila Executiva', 'Luminária LED', 'Garrafa Térmica',
+    'Relógio Digital', 'Sapato Casual', 'Blusa de Tricô', 'Headphone Gamer'
+]
+VARIANTS = ['Premium', 'Pro', 'Slim', 'Max', 'Lite', 'Plus', 'Classic', 'Ultra']
+# Share of generated posts per status; the rest are scheduled in the future
+POST_STATUS_SHARES = [('posted', 0.85), ('failed', 0.90), ('cancelled', 0.92)]
+CLICK_REVENUE = 0.05  # Same estimate as AnalyticsService
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk-load benchmark data")
+    parser.add_argument('--database-url', help="defaults to DATABASE_URL or the app database")
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help="history window for posts and analytics")
+    parser.add_argument('--inactive-share', type=float, default=0.05, help="share of inactive products")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--now', type=datetime.fromisoformat,
+                        help="reference time (ISO format) posts are generated around, defaults to today at midnight")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--truncate', action='store_true', help="delete existing products, posts, analytics and schedules first")
+    return parser.parse_args()
+
+def insert_batches(table, rows, batch_size, label):
+    """Insert rows from a generator with one executemany per batch"""
+    from app import db
+    
+    started = time.time()
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            count += len(batch)
+            batch = []
+            print(f"  {label}: {count} rows ({count / (time.time() - started):.0f} rows/s)", end='\r', flush=True)
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        count += len(batch)
+    
+    elapsed = time.time() - started
+    print(f"✓ {label}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} rows/s)" + ' ' * 20)
+    return count
+
+def truncate():
+    from app import db
+    from models import Post, PostQuota, PriceHistory, ProductRotation, Product, Analytics, ScheduleConfig, SyncCheckpoint
+    
+    # Daily counters are counted again from the new posts the first time a day is used
+    for model in (Post, PostQuota, PriceHistory, ProductRotation, Product, Analytics, ScheduleConfig):
+        db.session.execute(model.__table__.delete())
+    # The rotation is rebuilt from scratch on its next refill
+    db.session.execute(SyncCheckpoint.__table__.delete().where(SyncCheckpoint.name.like('product_rotation%')))
+    db.session.commit()
+    print("✓ Existing data deleted")
+
+def product_rows(rng, count, inactive_share, now, days):
+    from services.image_resolver import image_resolver
+    
+    for n in range(count):
+        shopee_id = f"BENCH{n:09d}"
+        name = rng.choice(PRODUCT_NAMES)
+        category = rng.choice(CATEGORIES)
+        title = f"{name} {rng.choice(VARIANTS)} {n}"
+        original_price = round(rng.uniform(19.9, 499.9), 2)
+        discount = rng.choice([0, 0, 5, 10, 15, 20, 30, 40, 50])
+        created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+        
+        yield {
+            'shopee_id': shopee_id,
+            'title': title,
+            'description': f"{name} com entrega rápida para todo o Brasil.",
+            'price': round(original_price * (1 - discount / 100), 2),
+            'original_price': original_price,
+            'discount': discount,
+            'image_url': image_resolver.resolve_for_product(shopee_id, title, category),
+            'category': category,
+            'rating': round(rng.uniform(3.5, 5.0), 1),
+            'sold_count': int(rng.paretovariate(1.2) * 50),
+            'product_url': f"https://shopee.com.br/product/{shopee_id}",
+            'affiliate_link': f"https://shopee.com.br/product/{shopee_id}?af=benchmark&pid=partner&c=affiliate",
+            'is_active': rng.random() >= inactive_share,
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+
+def engagement(rng, platform):
+    """Heavy-tailed engagement with the keys each platform reports"""
+    likes = int(rng.lognormvariate(3, 1.2))
+    shares = int(likes * rng.uniform(0, 0.2))
+    comments = int(likes * rng.uniform(0, 0.1))
+    clicks = int(likes * rng.uniform(0.05, 0.5))
+    if platform == 'twitter':
+        return {'likes': likes, 'retweets': shares, 'replies': comments, 'clicks': clicks}
+    return {'likes': likes, 'shares': shares, 'comments': comments, 'clicks': clicks}
+
+def post_rows(rng, count, products, now, days, daily_totals):
+    """Generate posts and accumulate per (date, platform) totals for analytics"""
+    for _ in range(count):
+        product_id, title, price = products[rng.randrange(len(products))]
+        platform = rng.choice(PLATFORMS)
+        
+        share = rng.random()
+        status = next((name for name, cumulative in POST_STATUS_SHARES if share < cumulative), 'scheduled')
+        if status == 'scheduled':
+            scheduled_time = now + timedelta(seconds=rng.randint(60, 7 * 86400))
+        else:
+            scheduled_time = now - timedelta(seconds=rng.randint(60, days * 86400))
+        
+        row = {
+            'product_id': product_id,
+            'platform': platform,
+            'content': f"🔥 OFERTA IMPERDÍVEL! 🔥\n\n{title}\n💰 R$ {price:.2f}\n\n#shopee #ofertas #achadinhos",
+            'status': status,
+            'scheduled_time': scheduled_time,
+            'posted_time': None,
+            'post_id': None,
+            'engagement_data': None,
+            'error_message': None,
+            'created_at': min(scheduled_time, now) - timedelta(minutes=rng.randint(1, 600))
+        }
+        
+        if status == 'posted':
+            data = engagement(rng, platform)
+            row.update(
+                posted_time=scheduled_time + timedelta(seconds=rng.randint(0, 120)),
+                post_id=str(rng.getrandbits(60)),
+                engagement_data=data
+            )
+            totals = daily_totals.setdefault((row['posted_time'].date(), platform), [0, 0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += data['likes']
+            totals[2] += data.get('shares', 0) + data.get('retweets', 0)
+            totals[3] += data.get('comments', 0) + data.get('replies', 0)
+            totals[4] += data['clicks']
+        elif status == 'failed':
+            row['error_message'] = rng.choice(['Rate limit exceeded', 'Invalid access token', 'Image download failed'])
+        
+        yield row
+
+def analytics_rows(daily_totals, now):
+    for (day, platform), (posts, likes, shares, comments, clicks) in sorted(daily_totals.items()):
+        yield {
+            'date': day,
+            'platform': platform,
+            'posts_count': posts,
+            'total_likes': likes,
+            'total_shares': shares,
+            'total_comments': comments,
+            'clicks': clicks,
+            'estimated_revenue': round(clicks * CLICK_REVENUE, 2),
+            'created_at': now
+        }
+
+def ensure_schedules():
+    from app import db
+    from models import ScheduleConfig
+    
+    for platform in PLATFORMS:
+        if not ScheduleConfig.query.filter_by(platform=platform).first():
+            db.session.add(ScheduleConfig(
+                platform=platform,
+                interval_hours=4,
+                max_posts_per_day=6,
+                posting_times=['09:00', '13:00', '17:00', '21:00'],
+                is_active=True
+            ))
+    db.session.commit()
+    print("✓ Posting schedules configured")
+
+def generate_benchmark_data(args):
+    """Load the requested volume of data; the same seed and --now always give the same rows"""
+    from app import app, db
+    from models import Product, Post, Analytics
+    
+    rng = random.Random(args.seed)
+    # Whole days, so reruns on the same day produce identical data
+    now = args.now or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    
+    with app.app_context():
+        print(f"🚀 Generating benchmark data in {db.engine.url.render_as_string(hide_password=True)}")
+        if args.truncate:
+            truncate()
+        elif db.session.query(Product.id).filter(Product.shopee_id.like('BENCH%')).first():
+            print("⚠️ Benchmark products already exist, rerun with --truncate")
+            return 1
+        
+        insert_batches(Product.__table__, product_rows(rng, args.products, args.inactive_share, now, args.days),
+                       args.batch_size, "Products")
+        
+        products = db.session.execute(
+            db.select(Product.id, Product.title, Product.price).where(Product.shopee_id.like('BENCH%')).order_by(Product.id)
+        ).all()
+        if not products:
+            print("⚠️ No products to post about")
+            return 1
+        
+        daily_totals = {}
+        insert_batches(Post.__table__, post_rows(rng, args.posts, products, now, args.days, daily_totals),
+                       args.batch_size, "Posts")
+        if daily_totals:
+            # Generated totals replace whatever analytics the window already had
+            days = [day for day, _ in daily_totals]
+            db.session.execute(Analytics.__table__.delete().where(Analytics.date.between(min(days), max(days))))
+            db.session.commit()
+        insert_batches(Analytics.__table__, analytics_rows(daily_totals, now), args.batch_size, "Analytics")
+        ensure_schedules()
+        
+        print("✓ Benchmark data ready!")
+        return 0
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.database_url:
+        # app.py reads DATABASE_URL when it is first imported
+        os.environ['DATABASE_URL'] = args.database_url
+    sys.exit(generate_benchmark_data(args))
@@ -24,6 +24,10 @@ class Product(db.Model):
     
     # Relationship with posts
     posts = db.relationship('Post', backref='product', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_product_updated_at', 'updated_at'),
+    )
 
 class Post(db.Model):
     """Model for social media posts"""
@@ -31,14 +35,29 @@ class Post(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     platform = db.Column(db.String(50), nullable=False)  # instagram, facebook, twitter
     content = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), default='scheduled')  # scheduled, posted, failed
+    status = db.Column(db.String(20), default='scheduled')  # scheduled, pending, publishing, posted, failed, dead, cancelled
     scheduled_time = db.Column(db.DateTime)
     posted_time = db.Column(db.DateTime)
     post_id = db.Column(db.String(100))  # Platform-specific post ID
     engagement_data = db.Column(JSON)  # Store likes, shares, comments
     error_message = db.Column(db.Text)
+    claimed_by = db.Column(db.String(100))  # Dispatcher claim token while publishing
+    claimed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, server_default='0')  # Failed publish attempts
+    next_attempt_at = db.Column(db.DateTime)  # When a failed post is retried
+    engagement_checked_at = db.Column(db.DateTime)
+    next_engagement_at = db.Column(db.DateTime)  # When engagement is polled next
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_post_status_scheduled', 'status', 'scheduled_time'),
+        db.Index('ix_post_retry', 'status', 'platform', 'next_attempt_at'),
+        db.Index('ix_post_engagement_due', 'status', 'next_engagement_at'),
+        db.Index('ix_post_platform_scheduled', 'platform', 'scheduled_time'),
+        db.Index('ix_post_created_at', 'created_at'),
+        db.Index('ix_post_status_created', 'status', 'created_at'),
+    )
+    
     def get_engagement_data(self):
         """Get engagement data as dict"""
         if self.engagement_data:
@@ -99,3 +118,63 @@ class Analytics(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (db.UniqueConstraint('date', 'platform'),)
+
+class SyncCheckpoint(db.Model):
+    """Model for resumable sync progress against the Shopee API"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    offset = db.Column(db.Integer, default=0)  # Next get_item_list offset to request
+    watermark = db.Column(db.Integer)  # Unix time up to which updates have been synced
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PostQuota(db.Model):
+    """Model for the number of posts created per platform and day"""
+    id = db.Column(db.Integer, primary_key=True)
+    platform = db.Column(db.String(50), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # Date in the scheduler timezone
+    count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    __table_args__ = (db.UniqueConstraint('platform', 'day'),)
+
+class ProductRotation(db.Model):
+    """Model for the per-platform queue of products to post next"""
+    id = db.Column(db.Integer, primary_key=True)
+    platform = db.Column(db.String(50), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)  # Higher is posted first
+    cooldown_until = db.Column(db.DateTime)  # Not picked again before this time
+    
+    __table_args__ = (
+        db.UniqueConstraint('platform', 'product_id'),
+        db.Index('ix_product_rotation_rank', 'platform', 'score'),
+        db.Index('ix_product_rotation_cooldown', 'platform', 'cooldown_until'),
+    )
+
+class SchedulerLease(db.Model):
+    """Model for the lease held by the process that runs scheduled jobs"""
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)  # host:pid:id of the leader
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class PriceHistory(db.Model):
+    """Model for append-only product price changes"""
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    original_price = db.Column(db.Float)
+    discount = db.Column(db.Integer, default=0)
+    previous_price = db.Column(db.Float)  # Price before this change, empty for the first observation
+    drop_percent = db.Column(db.Float, default=0.0)  # Drop relative to previous_price, negative for increases
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_price_history_recorded_drop', 'recorded_at', 'drop_percent'),
+        db.Index('ix_price_history_product_recorded', 'product_id', 'recorded_at'),
+    )
+
+class CategoryFacet(db.Model):
+    """Model for per-category active product counts, maintained by database triggers"""
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(100), unique=True, nullable=False)
+    active_count = db.Column(db.Integer, default=0, nullable=False)
@@ -1,11 +1,16 @@
-from flask import render_template, request, jsonify, redirect, url_for, flash
+from flask import render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context
 from app import app, db
 from models import Product, Post, SocialMediaAccount, ScheduleConfig, AffiliateConfig, Analytics
 from services.shopee_service import ShopeeService
 from services.social_media_service import SocialMediaService
 from services.scheduler_service import SchedulerService
 from services.analytics_service import AnalyticsService
+from services.search_service import SearchService
+from services.facet_service import FacetService
+from services.post_dispatcher import post_dispatcher
+from services.campaign_service import CampaignService, CampaignError, DEFAULT_CAMPAIGN_DAYS
 from datetime import datetime, timedelta
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +20,9 @@ shopee_service = ShopeeService()
 social_media_service = SocialMediaService()
 scheduler_service = SchedulerService()
 analytics_service = AnalyticsService()
+search_service = SearchService()
+facet_service = FacetService()
+campaign_service = CampaignService()
 
 @app.route('/')
 def dashboard():
@@ -68,17 +76,21 @@ def products():
         query = query.filter(Product.category == category)
     
     if search:
-        query = query.filter(Product.title.contains(search))
+        # Ranked by relevance
+        query = search_service.apply_search(query, search)
+    else:
+        query = query.order_by(Product.created_at.desc())
     
-    products = query.order_by(Product.created_at.desc()).paginate(
+    products = query.paginate(
         page=page, per_page=12, error_out=False)
     
-    categories = db.session.query(Product.category).distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
+    category_counts = facet_service.get_category_counts()
+    categories = [category for category, count in category_counts]
     
     return render_template('products.html', 
                          products=products, 
                          categories=categories,
+                         category_counts=dict(category_counts),
                          current_category=category,
                          current_search=search)
 
@@ -86,17 +98,17 @@ def products():
 def refresh_products():
     """Refresh products from Shopee"""
     try:
-        new_products = shopee_service.fetch_trending_products()
+        force_refresh = request.args.get('force') == '1'
+        new_products = shopee_service.fetch_trending_products(force_refresh=force_refresh)
         
         # Update existing products with new image URLs
-        existing_products = Product.query.filter_by(is_active=True).all()
-        for product in existing_products:
-            if not product.image_url or 'placeholder' in product.image_url:
-                category_num = hash(product.shopee_id) % 100
-                product.image_url = shopee_service.get_product_image_url(product.category, category_num)
+        shopee_service.assign_missing_images()
         
-        db.session.commit()
-        flash(f'Successfully added {len(new_products)} new products and updated existing ones!', 'success')
+        # Prices, discounts and status of existing products come from the delta sync job
+        if shopee_service.request_delta_sync():
+            flash(f'Successfully added {len(new_products)} new products! Existing products are being updated in the background.', 'success')
+        else:
+            flash(f'Successfully added {len(new_products)} new products and updated existing ones!', 'success')
     except Exception as e:
         logger.error(f"Error refreshing products: {e}")
         flash('Error refreshing products. Please try again.', 'error')
@@ -164,7 +176,7 @@ def history():
         page=page, per_page=20, error_out=False)
     
     platforms = ['instagram', 'facebook', 'twitter']
-    statuses = ['scheduled', 'posted', 'failed']
+    statuses = ['scheduled', 'pending', 'posted', 'failed', 'dead']
     
     return render_template('history.html', 
                          posts=posts, 
@@ -227,6 +239,7 @@ def update_settings():
         if not affiliate_config:
             affiliate_config = AffiliateConfig()
             db.session.add(affiliate_config)
+        affiliate_id_changed = affiliate_config.affiliate_id != affiliate_id
         
         affiliate_config.affiliate_id = affiliate_id
         affiliate_config.base_affiliate_url = base_affiliate_url
@@ -250,6 +263,11 @@ def update_settings():
                 account.updated_at = datetime.utcnow()
         
         db.session.commit()
+        
+        if affiliate_id_changed:
+            updated_count = shopee_service.update_product_affiliate_links()
+            logger.info(f"Affiliate ID changed, relinked {updated_count} products")
+        
         flash('Settings updated successfully!', 'success')
     except Exception as e:
         logger.error(f"Error updating settings: {e}")
@@ -259,27 +277,91 @@ def update_settings():
 
 @app.route('/api/post_now/<int:product_id>')
 def post_now(product_id):
-    """Create immediate post for a product"""
+    """Post a product to every active platform at once
+    
+    Platforms are published concurrently, so the response takes about as
+    long as the slowest platform. With ?stream=1 each platform's result is
+    sent as a JSON line as soon as it finishes, followed by the summary.
+    """
     try:
         product = Product.query.get_or_404(product_id)
         
-        # Create posts for all active platforms
-        active_accounts = SocialMediaAccount.query.filter_by(is_active=True).all()
-        posts_created = 0
+        accounts = {account.platform: account for account in SocialMediaAccount.query.filter_by(is_active=True).all()}
+        # Detached before the commit below can expire them, so the publishing threads can read them
+        for account in accounts.values():
+            db.session.expunge(account)
         
-        for account in active_accounts:
-            success = social_media_service.create_post(product, account.platform)
-            if success:
-                posts_created += 1
+        token = post_dispatcher.new_token()
+        post_ids = [post.id for post in social_media_service.create_claimed_posts(product, list(accounts), token)]
+        product_title = product.title
         
-        return jsonify({
-            'success': True, 
-            'message': f'Created {posts_created} posts for {product.title}'
-        })
+        def platform_results():
+            for post_id, posted in post_dispatcher.publish_as_completed(token, post_ids, accounts):
+                # Published in another session, and streamed responses outlive the view's session
+                post = db.session.get(Post, post_id, populate_existing=True)
+                yield {
+                    'platform': post.platform,
+                    'success': posted,
+                    'status': post.status,
+                    'error': post.error_message
+                }
+        
+        def summary(results):
+            posted = sum(1 for result in results if result['success'])
+            return {
+                'success': True,
+                'message': f'Posted to {posted} of {len(post_ids)} platforms for {product_title}',
+                'results': results
+            }
+        
+        if request.args.get('stream'):
+            def stream():
+                results = []
+                for result in platform_results():
+                    results.append(result)
+                    yield json.dumps(result) + '\n'
+                yield json.dumps(summary(results)) + '\n'
+            return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+        
+        return jsonify(summary(list(platform_results())))
     except Exception as e:
         logger.error(f"Error creating immediate post: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/campaigns', methods=['POST'])
+def create_campaign():
+    """Schedule posts for many products and platforms in one call
+    
+    Expects JSON with product_ids and optionally platforms, start_date
+    (YYYY-MM-DD), days and posting_times (a list, or a dict per platform).
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            raise CampaignError("Expected a JSON object")
+        
+        start_date = data.get('start_date')
+        if start_date is not None:
+            try:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise CampaignError("start_date must be a date in YYYY-MM-DD format")
+        
+        result = campaign_service.plan(
+            product_ids=data.get('product_ids'),
+            platforms=data.get('platforms'),
+            start_date=start_date,
+            days=data.get('days', DEFAULT_CAMPAIGN_DAYS),
+            posting_times=data.get('posting_times')
+        )
+        
+        return jsonify(dict(result, success=True, message=f"Scheduled {result['posts']} posts"))
+    except CampaignError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating campaign: {e}")
+        return jsonify({'success': False, 'message': 'Error creating campaign'}), 500
+
 @app.route('/api/toggle_product/<int:product_id>')
 def toggle_product(product_id):
     """Toggle product active status"""
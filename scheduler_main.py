@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Dedicated scheduler process for Shopee Affiliate Marketing System
+Runs the scheduled jobs so web workers can be started without them
+
+Usage:
+    SCHEDULER_MODE=follower gunicorn --workers 4 --bind 0.0.0.0:5000 main:app
+    python scheduler_main.py
+
+Several scheduler processes can run for redundancy; only the one holding
+the scheduler lease runs jobs at a time.
+"""
+
+import os
+import signal
+import threading
+
+# Web workers may share an environment with SCHEDULER_MODE=follower
+os.environ["SCHEDULER_MODE"] = "auto"
+
+from app import app
+
+def main():
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    
+    print("🚀 Scheduler process started, waiting for the scheduler lease")
+    stopped.wait()
+    print("✓ Scheduler process stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a response stays fresh, per endpoint; endpoints not listed are not cached
+ENDPOINT_TTLS = {
+    "/api/v2/product/get_item_base_info": 6 * 3600,
+    "/api/v2/product/get_item_list": 15 * 60,
+}
+
+# Request parameters that change on every call and must not be part of the key
+VOLATILE_PARAMS = {"timestamp", "sign", "access_token"}
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SHOPEE_API_CACHE_MAX_ENTRIES", "50000"))
+# Writes between size checks; the store may briefly exceed max_entries by this much
+EVICT_INTERVAL = 100
+
+class ApiResponseCache:
+    """SQLite-backed LRU cache for Shopee partner API responses
+    
+    Entries are keyed by endpoint plus normalized parameters and may carry a
+    validator (the item's update_time) so stale entries can be revalidated
+    against get_item_list without fetching the item again.
+    """
+    
+    def __init__(self, path, ttls=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+        self.writes_since_evict = 0
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS api_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, validator INTEGER,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS ix_api_cache_accessed_at ON api_cache (accessed_at)")
+    
+    def make_key(self, api_path, params):
+        """Build the cache key for an endpoint and its parameters"""
+        normalized = {k: v for k, v in (params or {}).items() if k not in VOLATILE_PARAMS}
+        return f"{api_path}?{json.dumps(normalized, sort_keys=True, default=str)}"
+    
+    def is_cacheable(self, api_path):
+        return self.ttls.get(api_path, 0) > 0
+    
+    def get(self, api_path, params, validator=None):
+        """Return the cached response or None
+        
+        An expired entry is still served, and its TTL renewed, when the caller
+        passes a validator that matches the stored one.
+        """
+        if not self.is_cacheable(api_path):
+            return None
+        
+        key = self.make_key(api_path, params)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, validator, stored_at FROM api_cache WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            
+            value, stored_validator, stored_at = row
+            if now - stored_at <= self.ttls[api_path]:
+                self.counters['hits'] += 1
+                self.connection.execute("UPDATE api_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            elif validator is not None and stored_validator is not None and validator <= stored_validator:
+                self.counters['revalidated'] += 1
+                self.connection.execute(
+                    "UPDATE api_cache SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+                )
+            else:
+                self.counters['misses'] += 1
+                return None
+        
+        return json.loads(value)
+    
+    def set(self, api_path, params, value, validator=None):
+        """Store a response and evict the least recently used entries over the size bound"""
+        if not self.is_cacheable(api_path):
+            return
+        
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO api_cache (key, value, validator, stored_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.make_key(api_path, params), json.dumps(value), validator, now, now)
+            )
+            self.writes_since_evict += 1
+            if self.writes_since_evict >= EVICT_INTERVAL:
+                self.evict()
+    
+    def evict(self):
+        self.writes_since_evict = 0
+        excess = self.connection.execute("SELECT COUNT(*) FROM api_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM api_cache WHERE key IN"
+                " (SELECT key FROM api_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.counters['evictions'] += excess
+    
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM api_cache")
+    
+    def stats(self):
+        """Hit/miss counters for this process plus the current entry count"""
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM api_cache").fetchone()[0]
+        lookups = self.counters['hits'] + self.counters['revalidated'] + self.counters['misses']
+        served = self.counters['hits'] + self.counters['revalidated']
+        return dict(self.counters, entries=entries, hit_rate=round(served / lookups, 3) if lookups else 0.0)
@@ -0,0 +1,186 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+import pytz
+from app import db
+from config import Config
+from models import Post, Product, ScheduleConfig, SocialMediaAccount
+from services.posting_slots import parse_posting_times
+from services.quota_service import quota_service
+from services.social_media_service import SocialMediaService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAMPAIGN_DAYS = 7
+MAX_CAMPAIGN_DAYS = 90
+# Largest number of posts planned in one call
+MAX_CAMPAIGN_POSTS = 20000
+# Posts sharing a posting slot are published this far apart
+CAMPAIGN_POST_SPACING_SECONDS = 60
+CAMPAIGN_INSERT_BATCH_SIZE = 1000
+
+class CampaignError(ValueError):
+    """Raised for campaign requests that cannot be planned"""
+
+class CampaignService:
+    """Service for scheduling posts for many products and platforms in one call
+    
+    Posts are bulk inserted as scheduled and published by the post
+    dispatcher once due, so a campaign adds no scheduler jobs.
+    """
+    
+    def __init__(self, timezone=Config.SCHEDULER_TIMEZONE):
+        self.timezone = pytz.timezone(timezone)
+        self.social_media_service = SocialMediaService()
+    
+    def plan(self, product_ids, platforms=None, start_date=None, days=DEFAULT_CAMPAIGN_DAYS, posting_times=None):
+        """Schedule every product once on every platform over the campaign window
+        
+        Products are spread evenly over the posting slots of each day from
+        start_date (today by default) in the schedule timezone. posting_times
+        is a list of 'HH:MM' times for all platforms, a dict of lists per
+        platform, or None for each platform's ScheduleConfig times.
+        
+        Campaign posts share each day's max_posts_per_day with every other
+        post, so a campaign that would push a platform over its limit on any
+        day is rejected as a whole. Raises CampaignError for requests that
+        cannot be planned.
+        """
+        if not isinstance(product_ids, list) or not all(self.is_integer(product_id) for product_id in product_ids):
+            raise CampaignError("product_ids must be a list of product ids")
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            raise CampaignError("No products given")
+        if not self.is_integer(days) or not 1 <= days <= MAX_CAMPAIGN_DAYS:
+            raise CampaignError(f"days must be a number of days between 1 and {MAX_CAMPAIGN_DAYS}")
+        if not self.is_posting_times(posting_times):
+            raise CampaignError("posting_times must be a list of 'HH:MM' times or a dict of such lists per platform")
+        
+        active_platforms = [account.platform for account in SocialMediaAccount.query.filter_by(is_active=True).all()]
+        if platforms is None:
+            platforms = active_platforms
+        if not isinstance(platforms, list) or not all(isinstance(platform, str) for platform in platforms):
+            raise CampaignError("platforms must be a list of platform names")
+        platforms = list(dict.fromkeys(platforms))
+        unknown = [platform for platform in platforms if platform not in self.social_media_service.platforms]
+        if unknown:
+            raise CampaignError(f"Unknown platforms: {', '.join(unknown)}")
+        inactive = [platform for platform in platforms if platform not in active_platforms]
+        if inactive:
+            raise CampaignError(f"No active account found for platforms: {', '.join(inactive)}")
+        if not platforms:
+            raise CampaignError("No active platforms to post on")
+        if len(product_ids) * len(platforms) > MAX_CAMPAIGN_POSTS:
+            raise CampaignError(f"Campaigns are limited to {MAX_CAMPAIGN_POSTS} posts")
+        
+        products = {}
+        for start in range(0, len(product_ids), CAMPAIGN_INSERT_BATCH_SIZE):
+            chunk = product_ids[start:start + CAMPAIGN_INSERT_BATCH_SIZE]
+            for product in Product.query.filter(Product.id.in_(chunk), Product.is_active == True):
+                products[product.id] = product
+        ordered = [products[product_id] for product_id in product_ids if product_id in products]
+        if not ordered:
+            raise CampaignError("None of the products are active")
+        
+        now = datetime.utcnow()
+        start_date = start_date or pytz.UTC.localize(now).astimezone(self.timezone).date()
+        schedules = {config.platform: config for config in ScheduleConfig.query.filter(ScheduleConfig.platform.in_(platforms))}
+        
+        rows = []
+        for platform in platforms:
+            slots = self.slot_times(start_date, days, self.posting_times_for(platform, posting_times, schedules), now)
+            if not slots:
+                raise CampaignError(f"No posting times left in the campaign window for {platform}")
+            for product, scheduled_time in self.assign(ordered, slots):
+                rows.append({
+                    'product_id': product.id,
+                    'platform': platform,
+                    'content': self.social_media_service.generate_post_content(product, platform),
+                    'status': 'scheduled',
+                    'scheduled_time': scheduled_time,
+                    'created_at': now
+                })
+        
+        per_day = Counter((row['platform'], quota_service.day_for(row['scheduled_time'])) for row in rows)
+        self.check_daily_limits(per_day)
+        
+        try:
+            for start in range(0, len(rows), CAMPAIGN_INSERT_BATCH_SIZE):
+                db.session.execute(Post.__table__.insert(), rows[start:start + CAMPAIGN_INSERT_BATCH_SIZE])
+            
+            # Count the posts towards the days they are scheduled for, in the same transaction
+            for (platform, day), count in per_day.items():
+                quota_service.add(platform, day, count)
+            db.session.commit()
+        
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        logger.info(f"Scheduled a campaign of {len(rows)} posts for {len(ordered)} products")
+        return {
+            'posts': len(rows),
+            'products': len(ordered),
+            'skipped_products': len(product_ids) - len(ordered),
+            'platforms': dict(Counter(row['platform'] for row in rows)),
+            'first_post_at': min(row['scheduled_time'] for row in rows).isoformat() + 'Z',
+            'last_post_at': max(row['scheduled_time'] for row in rows).isoformat() + 'Z'
+        }
+    
+    def check_daily_limits(self, per_day):
+        """Reject the campaign when its posts would take any platform and day over max_posts_per_day"""
+        limits = {}
+        over = []
+        for (platform, day), count in sorted(per_day.items()):
+            if platform not in limits:
+                limits[platform] = quota_service.daily_limit(platform)
+            used = quota_service.used(platform, day)
+            if used + count > limits[platform]:
+                over.append(f"{platform} on {day.isoformat()} ({count} planned, {used} already scheduled)")
+        if over:
+            raise CampaignError(
+                "Campaign exceeds the daily post limit for " + ', '.join(over)
+                + "; raise max_posts_per_day, add days or plan fewer products"
+            )
+    
+    def is_integer(self, value):
+        return isinstance(value, int) and not isinstance(value, bool)
+    
+    def is_posting_times(self, posting_times):
+        """None, a list of time strings, or a dict of such lists per platform"""
+        if isinstance(posting_times, dict):
+            return all(self.is_time_list(times) for times in posting_times.values())
+        return posting_times is None or self.is_time_list(posting_times)
+    
+    def is_time_list(self, times):
+        return isinstance(times, list) and all(isinstance(time, str) for time in times)
+    
+    def posting_times_for(self, platform, posting_times, schedules):
+        if isinstance(posting_times, dict):
+            posting_times = posting_times.get(platform)
+        if posting_times:
+            return posting_times
+        if platform in schedules:
+            return schedules[platform].get_posting_times()
+        return ScheduleConfig().get_posting_times()
+    
+    def slot_times(self, start_date, days, posting_times, now):
+        """Naive UTC times of the campaign's posting slots that are still ahead"""
+        minutes = parse_posting_times(posting_times)
+        slots = []
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            for minute in minutes:
+                local = self.timezone.localize(datetime(day.year, day.month, day.day, minute // 60, minute % 60))
+                slot = local.astimezone(pytz.UTC).replace(tzinfo=None)
+                if slot > now:
+                    slots.append(slot)
+        return slots
+    
+    def assign(self, products, slots):
+        """Spread products evenly over the slots, staggering posts that share one"""
+        per_slot = Counter()
+        for index, product in enumerate(products):
+            slot = slots[index * len(slots) // len(products)]
+            yield product, slot + timedelta(seconds=per_slot[slot] * CAMPAIGN_POST_SPACING_SECONDS)
+            per_slot[slot] += 1
@@ -0,0 +1,143 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import app, scheduler, db
+from models import Post
+from services.social_media_service import SocialMediaService
+
+logger = logging.getLogger(__name__)
+
+# (tier, posts younger than, or gaining at least this many interactions per hour, polled every)
+ENGAGEMENT_TIERS = [
+    ('hot', timedelta(hours=6), 30, timedelta(minutes=15)),
+    ('warm', timedelta(days=3), 5, timedelta(hours=2)),
+    ('cold', timedelta(days=30), None, timedelta(hours=24)),
+]
+# Posts older than the last tier are no longer polled
+ENGAGEMENT_MAX_AGE = ENGAGEMENT_TIERS[-1][1]
+
+# Posts refreshed per commit, and at most per run
+ENGAGEMENT_BATCH_SIZE = 200
+ENGAGEMENT_MAX_POSTS_PER_RUN = 5000
+ENGAGEMENT_POLL_INTERVAL_MINUTES = 5
+
+ENGAGEMENT_JOB_ID = "engagement_poller"
+
+class EngagementPoller:
+    """Refreshes engagement of posted posts, polling fresh and fast-moving posts more often
+    
+    Each posted post carries its next_engagement_at; a run takes the due
+    posts from that indexed queue, refreshes them and moves each one to the
+    interval of its tier.
+    """
+    
+    def __init__(self):
+        self.social_media_service = SocialMediaService()
+    
+    def schedule(self):
+        """Queue posts that predate tiered polling and register the periodic poll job"""
+        try:
+            self.backfill()
+            scheduler.add_job(
+                id=ENGAGEMENT_JOB_ID,
+                func=run_engagement_poller,
+                trigger='interval',
+                minutes=ENGAGEMENT_POLL_INTERVAL_MINUTES,
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        except Exception as e:
+            logger.error(f"Error scheduling engagement poller: {e}")
+    
+    def tier(self, age, velocity):
+        """Tier name and polling interval for a post, or None once it is too old to poll"""
+        if age >= ENGAGEMENT_MAX_AGE:
+            return None
+        for name, max_age, min_velocity, interval in ENGAGEMENT_TIERS:
+            if age < max_age or (min_velocity is not None and velocity >= min_velocity):
+                return name, interval
+        return None
+    
+    def schedule_next(self, post, velocity=0.0, now=None):
+        """Set when a posted post is polled next, from its age and engagement velocity"""
+        now = now or datetime.utcnow()
+        tier = self.tier(now - (post.posted_time or now), velocity)
+        post.next_engagement_at = now + tier[1] if tier else None
+    
+    def poll(self, batch_size=ENGAGEMENT_BATCH_SIZE, max_posts=ENGAGEMENT_MAX_POSTS_PER_RUN):
+        """Refresh due posts in batches, committing once per batch; returns how many were refreshed"""
+        polled = 0
+        try:
+            while polled < max_posts:
+                now = datetime.utcnow()
+                posts = Post.query.filter(
+                    Post.status == 'posted',
+                    Post.next_engagement_at <= now
+                ).order_by(Post.next_engagement_at).limit(min(batch_size, max_posts - polled)).all()
+                if not posts:
+                    break
+                
+                for post in posts:
+                    self.refresh(post, now)
+                db.session.commit()
+                polled += len(posts)
+            
+            if polled:
+                logger.info(f"Updated engagement data for {polled} posts")
+            return polled
+        
+        except Exception as e:
+            logger.error(f"Error polling engagement data: {e}")
+            db.session.rollback()
+            return polled
+    
+    def refresh(self, post, now):
+        """Fetch a post's engagement and reschedule it, without committing"""
+        previous = self.interactions(post.get_engagement_data())
+        try:
+            engagement = self.social_media_service.fetch_engagement(post)
+            post.engagement_data = json.dumps(engagement)
+        except Exception as e:
+            # Keep the old numbers and try again at the tier's interval
+            logger.error(f"Error fetching engagement for post {post.id}: {e}")
+            engagement = None
+        
+        velocity = 0.0
+        checked_at = post.engagement_checked_at or post.posted_time
+        if engagement is not None and checked_at:
+            hours = max((now - checked_at).total_seconds() / 3600, 1 / 60)
+            velocity = (self.interactions(engagement) - previous) / hours
+        
+        post.engagement_checked_at = now
+        self.schedule_next(post, velocity, now)
+    
+    def interactions(self, engagement):
+        return sum(value for value in engagement.values() if isinstance(value, (int, float)))
+    
+    def backfill(self):
+        """Queue recent posted posts that have never been scheduled for polling"""
+        try:
+            now = datetime.utcnow()
+            result = db.session.execute(
+                update(Post.__table__).where(
+                    Post.status == 'posted',
+                    Post.next_engagement_at.is_(None),
+                    Post.posted_time >= now - ENGAGEMENT_MAX_AGE
+                ).values(next_engagement_at=now)
+            )
+            db.session.commit()
+            if result.rowcount:
+                logger.info(f"Queued {result.rowcount} posts for engagement polling")
+        
+        except Exception as e:
+            logger.error(f"Error queueing posts for engagement polling: {e}")
+            db.session.rollback()
+
+engagement_poller = EngagementPoller()
+
+def run_engagement_poller():
+    """Scheduler entry point; jobs must reference a module-level function"""
+    with app.app_context():
+        engagement_poller.poll()
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from sqlalchemy import text, event
+from app import db
+from models import CategoryFacet, Product
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how stale counts written by other processes can be
+FACET_CACHE_TTL = 60
+
+SQLITE_FACET_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS category_facet_ai AFTER INSERT ON product"
+    " WHEN new.is_active AND new.category IS NOT NULL BEGIN"
+    " INSERT INTO category_facet (category, active_count) VALUES (new.category, 1)"
+    " ON CONFLICT (category) DO UPDATE SET active_count = active_count + 1;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS category_facet_ad AFTER DELETE ON product"
+    " WHEN old.is_active AND old.category IS NOT NULL BEGIN"
+    " UPDATE category_facet SET active_count = active_count - 1 WHERE category = old.category;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS category_facet_au AFTER UPDATE OF is_active, category ON product BEGIN"
+    " UPDATE category_facet SET active_count = active_count - 1 WHERE old.is_active AND category = old.category;"
+    " INSERT INTO category_facet (category, active_count)"
+    " SELECT new.category, 1 WHERE new.is_active AND new.category IS NOT NULL"
+    " ON CONFLICT (category) DO UPDATE SET active_count = active_count + 1;"
+    " END",
+]
+
+POSTGRES_FACET_DDL = [
+    "CREATE OR REPLACE FUNCTION category_facet_sync() RETURNS trigger LANGUAGE plpgsql AS $$"
+    " BEGIN"
+    " IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_active AND OLD.category IS NOT NULL THEN"
+    " UPDATE category_facet SET active_count = active_count - 1 WHERE category = OLD.category;"
+    " END IF;"
+    " IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active AND NEW.category IS NOT NULL THEN"
+    " INSERT INTO category_facet (category, active_count) VALUES (NEW.category, 1)"
+    " ON CONFLICT (category) DO UPDATE SET active_count = category_facet.active_count + 1;"
+    " END IF;"
+    " RETURN NULL;"
+    " END $$",
+    "DROP TRIGGER IF EXISTS category_facet_sync ON product",
+    "CREATE TRIGGER category_facet_sync AFTER INSERT OR DELETE OR UPDATE OF is_active, category ON product"
+    " FOR EACH ROW EXECUTE FUNCTION category_facet_sync()",
+]
+
+_cache_lock = threading.Lock()
+_cache = {'counts': None, 'loaded_at': 0.0}
+
+def invalidate_facet_cache():
+    with _cache_lock:
+        _cache['counts'] = None
+
+@event.listens_for(db.session, 'do_orm_execute')
+def track_bulk_product_writes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # Core statements on Product.__table__ carry no mapper, so match the table too
+    if orm_execute_state.bind_mapper is Product.__mapper__ \
+            or getattr(orm_execute_state.statement, 'table', None) is Product.__table__:
+        orm_execute_state.session.info['product_written'] = True
+
+@event.listens_for(db.session, 'after_flush')
+def track_product_flush(session, flush_context):
+    if any(isinstance(obj, Product) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['product_written'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_after_product_commit(session):
+    if session.info.pop('product_written', False):
+        invalidate_facet_cache()
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_product_writes(session):
+    session.info.pop('product_written', None)
+
+class FacetService:
+    """Service for category facet counts of the product catalog"""
+    
+    def ensure_counts(self):
+        """Install the triggers that keep category_facet in sync and seed it once"""
+        try:
+            dialect = db.engine.dialect.name
+            if dialect == 'sqlite':
+                statements = SQLITE_FACET_DDL
+            elif dialect == 'postgresql':
+                statements = POSTGRES_FACET_DDL
+            else:
+                logger.info(f"Facet triggers not available for {dialect}, counts need rebuild_counts()")
+                return
+            
+            with db.engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+            
+            if not CategoryFacet.query.first():
+                self.rebuild_counts()
+        
+        except Exception as e:
+            logger.error(f"Error setting up category facets: {e}")
+    
+    def rebuild_counts(self):
+        """Recompute every category count from the product table"""
+        try:
+            counts = db.session.query(Product.category, db.func.count(Product.id)).filter(
+                Product.is_active == True,
+                Product.category.isnot(None)
+            ).group_by(Product.category).all()
+            
+            CategoryFacet.query.delete()
+            db.session.add_all(CategoryFacet(category=category, active_count=count) for category, count in counts)
+            db.session.commit()
+            invalidate_facet_cache()
+            
+            logger.info(f"Rebuilt category facets for {len(counts)} categories")
+            return len(counts)
+        
+        except Exception as e:
+            logger.error(f"Error rebuilding category facets: {e}")
+            db.session.rollback()
+            return 0
+    
+    def get_category_counts(self):
+        """Get (category, active product count) pairs, served from the in-process cache"""
+        with _cache_lock:
+            if _cache['counts'] is not None and time.time() - _cache['loaded_at'] < FACET_CACHE_TTL:
+                return _cache['counts']
+        
+        try:
+            counts = [
+                (facet.category, facet.active_count)
+                for facet in CategoryFacet.query.filter(CategoryFacet.active_count > 0).order_by(CategoryFacet.category)
+            ]
+        except Exception as e:
+            logger.error(f"Error getting category facets: {e}")
+            return []
+        
+        with _cache_lock:
+            _cache['counts'] = counts
+            _cache['loaded_at'] = time.time()
+        return counts
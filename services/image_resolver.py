@@ -0,0 +1,145 @@
+import zlib
+from collections import deque
+
+UNSPLASH = 'https://images.unsplash.com/{}?w=300&h=300&fit=crop&crop=center'
+
+# Title keywords and their image, in priority order: when a title contains
+# keywords of several rules, the earliest rule wins
+KEYWORD_IMAGE_RULES = [
+    (('smartwatch', 'relógio'), UNSPLASH.format('photo-1523275335684-37898b6baf30')),
+    (('fone', 'headphone'), UNSPLASH.format('photo-1505740420928-5e560c06d30e')),
+    (('tênis', 'sapato'), UNSPLASH.format('photo-1542291026-7eec264c27ff')),
+    (('vestido',), UNSPLASH.format('photo-1595777457583-95e059d581b8')),
+    (('blusa', 'camisa'), UNSPLASH.format('photo-1434389677669-e08b4cac3105')),
+    (('panela', 'cozinha'), UNSPLASH.format('photo-1556909114-f6e7ad7d3136')),
+    (('skincare', 'beleza'), UNSPLASH.format('photo-1556228720-195a672e8a03')),
+    (('suporte', 'notebook'), UNSPLASH.format('photo-1527864550417-7fd91fc51a46')),
+]
+
+# Category-specific fallback images
+CATEGORY_IMAGES = {
+    'Eletrônicos': [
+        UNSPLASH.format('photo-1498049794561-7780e7231661'),
+        UNSPLASH.format('photo-1560472354-b33ff0c44a43'),
+        UNSPLASH.format('photo-1505740420928-5e560c06d30e'),
+        UNSPLASH.format('photo-1523275335684-37898b6baf30'),
+    ],
+    'Moda Feminina': [
+        UNSPLASH.format('photo-1595777457583-95e059d581b8'),
+        UNSPLASH.format('photo-1434389677669-e08b4cac3105'),
+        UNSPLASH.format('photo-1581338834647-b0fb40704e21'),
+        UNSPLASH.format('photo-1515372039744-b8f02a3ae446'),
+    ],
+    'Moda Masculina': [
+        UNSPLASH.format('photo-1542291026-7eec264c27ff'),
+        UNSPLASH.format('photo-1603252109612-ffd69d493909'),
+        UNSPLASH.format('photo-1594938298603-c8148c4dae35'),
+        UNSPLASH.format('photo-1618886614638-80e3c103d31a'),
+    ],
+    'Casa e Jardim': [
+        UNSPLASH.format('photo-1556909114-f6e7ad7d3136'),
+        UNSPLASH.format('photo-1586023492125-27b2c045efd7'),
+        UNSPLASH.format('photo-1555041469-a586c61ea9bc'),
+        UNSPLASH.format('photo-1527864550417-7fd91fc51a46'),
+    ],
+    'Beleza e Cuidados': [
+        UNSPLASH.format('photo-1556228720-195a672e8a03'),
+        UNSPLASH.format('photo-1596462502278-27bfdc403348'),
+        UNSPLASH.format('photo-1522335789203-aabd1fc54bc9'),
+        UNSPLASH.format('photo-1571019613454-1cb2f99b2d8b'),
+    ],
+    'Esportes': [
+        UNSPLASH.format('photo-1542291026-7eec264c27ff'),
+        UNSPLASH.format('photo-1571019613454-1cb2f99b2d8b'),
+        UNSPLASH.format('photo-1594938298603-c8148c4dae35'),
+        UNSPLASH.format('photo-1523275335684-37898b6baf30'),
+    ],
+}
+DEFAULT_IMAGE_CATEGORY = 'Eletrônicos'
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds the highest-priority keyword in one pass over a text"""
+    
+    def __init__(self, rules):
+        # Node 0 is the root; outputs hold the best (lowest) rule index ending at a node
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]
+        self.values = [value for _, value in rules]
+        
+        for priority, (keywords, _) in enumerate(rules):
+            for keyword in keywords:
+                self.add(keyword, priority)
+        self.build_failure_links()
+    
+    def add(self, keyword, priority):
+        node = 0
+        for char in keyword:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        if self.output[node] is None or priority < self.output[node]:
+            self.output[node] = priority
+    
+    def build_failure_links(self):
+        # Breadth-first, so a node's failure target is always resolved before its children
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                
+                # A node also ends every keyword that ends at its failure node
+                inherited = self.output[self.fail[child]]
+                if inherited is not None and (self.output[child] is None or inherited < self.output[child]):
+                    self.output[child] = inherited
+    
+    def match(self, text):
+        """Return the value of the highest-priority rule with a keyword in text, or None"""
+        goto, fail, output = self.goto, self.fail, self.output
+        best = None
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = output[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return None if best is None else self.values[best]
+
+def stable_index(key, size):
+    """Pick an index from a key that is the same in every process (unlike hash())"""
+    return zlib.crc32(str(key).encode('utf-8')) % size
+
+class ImageResolver:
+    """Resolves product images from titles and categories with a prebuilt index"""
+    
+    def __init__(self, rules=KEYWORD_IMAGE_RULES, category_images=CATEGORY_IMAGES):
+        self.matcher = KeywordMatcher(rules)
+        self.category_images = category_images
+    
+    def category_image(self, category, product_num):
+        images = self.category_images.get(category, self.category_images[DEFAULT_IMAGE_CATEGORY])
+        return images[product_num % len(images)]
+    
+    def resolve(self, title, category, product_num):
+        """Image for a title keyword, falling back to the category images"""
+        return self.matcher.match((title or '').lower()) or self.category_image(category, product_num)
+    
+    def resolve_for_product(self, shopee_id, title, category):
+        """Deterministic image for a stored product"""
+        images = self.category_images.get(category, self.category_images[DEFAULT_IMAGE_CATEGORY])
+        return self.resolve(title, category, stable_index(shopee_id, len(images)))
+
+# Built once at import and shared by every caller
+image_resolver = ImageResolver()
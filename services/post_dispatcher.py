@@ -0,0 +1,295 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import app, scheduler, db
+from models import Post, SocialMediaAccount
+from services.social_media_service import SocialMediaService
+
+logger = logging.getLogger(__name__)
+
+# Posts published at the same time by one process
+POST_DISPATCH_WORKERS = int(os.environ.get("POST_DISPATCH_WORKERS", "4"))
+# Workers reserved for "post now" requests, so they never queue behind a background batch
+INTERACTIVE_PUBLISH_WORKERS = int(os.environ.get("INTERACTIVE_PUBLISH_WORKERS", "3"))
+# Posts claimed per round trip
+POST_DISPATCH_BATCH_SIZE = int(os.environ.get("POST_DISPATCH_BATCH_SIZE", "20"))
+# How often queued posts are picked up when nobody wakes the dispatcher
+POST_DISPATCH_INTERVAL_SECONDS = 15
+# Claims older than this belong to a dispatcher that died mid-publish
+CLAIM_TIMEOUT_MINUTES = 10
+# Scheduled posts moved to the queue per round once due
+DUE_BATCH_SIZE = 500
+# Failed posts moved back to the queue per platform and pass
+RETRY_BATCH_SIZE = 50
+# Posts published at the same time per platform, to stay under their rate limits
+PLATFORM_CONCURRENCY = {'instagram': 1, 'twitter': 2, 'facebook': 2}
+DEFAULT_PLATFORM_CONCURRENCY = 2
+
+DISPATCH_JOB_ID = "post_dispatcher"
+
+class PostDispatcher:
+    """Publishes queued posts from the database outbox with a pool of workers
+    
+    Immediate posts are created as pending, scheduled posts become pending
+    once due, and pending posts are claimed in batches before publishing:
+    Postgres claims rows with FOR UPDATE SKIP LOCKED, other databases with
+    a single conditional UPDATE. Several processes can dispatch at once and
+    each post is published by only one of them.
+    """
+    
+    def __init__(self, workers=POST_DISPATCH_WORKERS, batch_size=POST_DISPATCH_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="post-dispatch")
+        self.interactive_executor = ThreadPoolExecutor(
+            max_workers=INTERACTIVE_PUBLISH_WORKERS, thread_name_prefix="post-now"
+        )
+        self.social_media_service = SocialMediaService()
+        self.dispatch_lock = threading.Lock()
+        self.rerun = threading.Event()
+        self.platform_slots = {}
+        self.platform_slots_lock = threading.Lock()
+    
+    def schedule(self):
+        """Register the periodic dispatch job"""
+        try:
+            scheduler.add_job(
+                id=DISPATCH_JOB_ID,
+                func=run_post_dispatcher,
+                trigger='interval',
+                seconds=POST_DISPATCH_INTERVAL_SECONDS,
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        except Exception as e:
+            logger.error(f"Error scheduling post dispatcher: {e}")
+    
+    def wake_up(self):
+        """Dispatch right away instead of waiting for the next interval"""
+        threading.Thread(target=self.dispatch, name="post-dispatch-wake", daemon=True).start()
+    
+    def dispatch(self):
+        """Publish every due pending post; returns how many were posted"""
+        if not self.dispatch_lock.acquire(blocking=False):
+            # The running pass picks up whatever was queued meanwhile
+            self.rerun.set()
+            return 0
+        
+        try:
+            posted = 0
+            with app.app_context():
+                self.release_stale_claims()
+                self.requeue_due_retries()
+                while True:
+                    self.rerun.clear()
+                    self.queue_due_posts()
+                    token, post_ids = self.claim(self.batch_size)
+                    if not post_ids:
+                        if self.rerun.is_set():
+                            continue
+                        break
+                    posted += sum(self.publish_claimed(token, post_ids))
+            return posted
+        
+        except Exception as e:
+            logger.error(f"Error dispatching posts: {e}")
+            return 0
+        finally:
+            self.dispatch_lock.release()
+    
+    def new_token(self):
+        """Claim token unique to one batch of this dispatcher"""
+        return f"{self.worker_id}:{uuid.uuid4().hex[:12]}"
+    
+    def claim(self, limit, post_ids=None):
+        """Claim up to limit due pending posts, returning (token, claimed ids)"""
+        now = datetime.utcnow()
+        token = self.new_token()
+        due = db.select(Post.id).where(
+            Post.status == 'pending',
+            Post.scheduled_time <= now
+        ).order_by(Post.scheduled_time).limit(limit)
+        if post_ids is not None:
+            due = due.where(Post.id.in_(post_ids))
+        
+        claim = update(Post.__table__).values(status='publishing', claimed_by=token, claimed_at=now)
+        try:
+            if db.session.get_bind().dialect.name == 'postgresql':
+                # Rows locked by another dispatcher are skipped instead of waited for
+                ids = db.session.execute(due.with_for_update(skip_locked=True)).scalars().all()
+                if ids:
+                    db.session.execute(claim.where(Post.id.in_(ids)))
+            else:
+                # One statement, so concurrent dispatchers can never claim the same row
+                # and RETURNING hands back the claimed ids without reading them again
+                ids = db.session.execute(
+                    claim.where(Post.id.in_(due.scalar_subquery()), Post.status == 'pending').returning(Post.id)
+                ).scalars().all()
+            
+            db.session.commit()
+            return token, ids
+        
+        except Exception as e:
+            logger.error(f"Error claiming posts: {e}")
+            db.session.rollback()
+            return token, []
+    
+    def publish_claimed(self, token, post_ids):
+        """Publish claimed posts in parallel; returns one success flag per post"""
+        return list(self.executor.map(lambda post_id: self.publish(token, post_id), post_ids))
+    
+    def publish_as_completed(self, token, post_ids, accounts=None):
+        """Publish claimed posts in parallel, yielding (post_id, posted) as each one finishes
+        
+        Runs on the interactive pool; only the per-platform rate limits are
+        shared with background dispatching. accounts maps platforms to the
+        caller's already loaded, detached accounts, so the publishing threads
+        do not look them up again.
+        """
+        futures = {
+            self.interactive_executor.submit(self.publish, token, post_id, accounts): post_id
+            for post_id in post_ids
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    
+    def publish(self, token, post_id, accounts=None):
+        """Publish one claimed post and store the outcome"""
+        with app.app_context():
+            try:
+                post = db.session.get(Post, post_id)
+                if not post or post.status != 'publishing' or post.claimed_by != token:
+                    return False
+                
+                account = (accounts or {}).get(post.platform)
+                if account is None:
+                    account = SocialMediaAccount.query.filter_by(platform=post.platform, is_active=True).first()
+                if account:
+                    with self.platform_slot(post.platform):
+                        self.social_media_service.publish_post(post, account)
+                else:
+                    self.social_media_service.record_failure(post, f"No active account found for platform: {post.platform}")
+                
+                post.claimed_by = None
+                post.claimed_at = None
+                db.session.commit()
+                return post.status == 'posted'
+            
+            except Exception as e:
+                logger.error(f"Error publishing post {post_id}: {e}")
+                db.session.rollback()
+                self.fail_claimed(token, post_id, f"Error publishing post: {e}")
+                return False
+    
+    def fail_claimed(self, token, post_id, error_message):
+        """Count a failed attempt on a post still claimed with token; a leftover claim expires otherwise"""
+        try:
+            post = db.session.get(Post, post_id)
+            if post and post.status == 'publishing' and post.claimed_by == token:
+                self.social_media_service.record_failure(post, error_message)
+                post.claimed_by = None
+                post.claimed_at = None
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Error recording failure of post {post_id}: {e}")
+            db.session.rollback()
+    
+    def platform_slot(self, platform):
+        """Semaphore limiting concurrent publishes to one platform"""
+        with self.platform_slots_lock:
+            if platform not in self.platform_slots:
+                limit = PLATFORM_CONCURRENCY.get(platform, DEFAULT_PLATFORM_CONCURRENCY)
+                self.platform_slots[platform] = threading.BoundedSemaphore(limit)
+            return self.platform_slots[platform]
+    
+    def queue_due_posts(self, batch_size=DUE_BATCH_SIZE):
+        """Move scheduled posts whose time has come to pending, oldest first"""
+        try:
+            # Served by ix_post_status_scheduled
+            due = db.select(Post.id).where(
+                Post.status == 'scheduled',
+                Post.scheduled_time <= datetime.utcnow()
+            ).order_by(Post.scheduled_time).limit(batch_size)
+            result = db.session.execute(
+                update(Post.__table__).where(
+                    Post.id.in_(due.scalar_subquery()),
+                    Post.status == 'scheduled'
+                ).values(status='pending')
+            )
+            db.session.commit()
+            return result.rowcount
+        
+        except Exception as e:
+            logger.error(f"Error queueing due scheduled posts: {e}")
+            db.session.rollback()
+            return 0
+    
+    def requeue_due_retries(self, batch_size=RETRY_BATCH_SIZE):
+        """Move failed posts whose retry is due back to pending, at most batch_size per platform"""
+        try:
+            now = datetime.utcnow()
+            platforms = db.session.execute(db.select(SocialMediaAccount.platform)).scalars().all()
+            requeued = 0
+            
+            for platform in platforms:
+                # Served by ix_post_retry; posts failed before retries existed have no next attempt
+                due = db.select(Post.id).where(
+                    Post.status == 'failed',
+                    Post.platform == platform,
+                    Post.next_attempt_at <= now
+                ).order_by(Post.next_attempt_at).limit(batch_size)
+                result = db.session.execute(
+                    update(Post.__table__).where(
+                        Post.id.in_(due.scalar_subquery()),
+                        Post.status == 'failed'
+                    ).values(status='pending', next_attempt_at=None)
+                )
+                requeued += result.rowcount
+            
+            db.session.commit()
+            if requeued:
+                logger.info(f"Queued {requeued} failed posts for retry")
+            return requeued
+        
+        except Exception as e:
+            logger.error(f"Error queueing failed posts for retry: {e}")
+            db.session.rollback()
+            return 0
+    
+    def release_stale_claims(self):
+        """Fail the posts of dispatchers that stopped mid-publish
+        
+        Each one counts as an attempt, so a post that crashes its publisher
+        backs off and is eventually given up on like any other failure.
+        """
+        try:
+            cutoff = datetime.utcnow() - timedelta(minutes=CLAIM_TIMEOUT_MINUTES)
+            stale = Post.query.filter(
+                Post.status == 'publishing',
+                Post.claimed_at < cutoff
+            ).with_for_update().all()
+            for post in stale:
+                self.social_media_service.record_failure(
+                    post, f"Publishing did not finish within {CLAIM_TIMEOUT_MINUTES} minutes"
+                )
+                post.claimed_by = None
+                post.claimed_at = None
+            db.session.commit()
+            if stale:
+                logger.warning(f"Released {len(stale)} stale post claims")
+        
+        except Exception as e:
+            logger.error(f"Error releasing stale post claims: {e}")
+            db.session.rollback()
+
+post_dispatcher = PostDispatcher()
+
+def run_post_dispatcher():
+    """Scheduler entry point; jobs must reference a module-level function"""
+    post_dispatcher.dispatch()
@@ -0,0 +1,88 @@
+import logging
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import pytz
+from apscheduler.triggers.base import BaseTrigger
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+def parse_posting_times(posting_times):
+    """Sorted, unique minutes of the day for 'HH:MM' posting times, skipping invalid ones"""
+    minutes = set()
+    for value in posting_times or []:
+        try:
+            hour, minute = (int(part) for part in str(value).strip().split(':'))
+        except ValueError:
+            logger.warning(f"Ignoring invalid posting time: {value!r}")
+            continue
+        if 0 <= hour < 24 and 0 <= minute < 60:
+            minutes.add(hour * 60 + minute)
+        else:
+            logger.warning(f"Ignoring invalid posting time: {value!r}")
+    return tuple(sorted(minutes))
+
+def slots_for_schedule(schedule_config):
+    """Posting slots of a schedule: its posting times, or every interval_hours from midnight"""
+    slots = parse_posting_times(schedule_config.get_posting_times())
+    if slots:
+        return slots
+    interval = max(schedule_config.interval_hours or 6, 1) * 60
+    return tuple(range(0, MINUTES_PER_DAY, interval))
+
+class PostingSlotTrigger(BaseTrigger):
+    """Fires at fixed local times of day, e.g. 09:00, 14:00 and 18:00 in São Paulo
+    
+    The slots are kept as a sorted table of minutes of the day, so the next
+    fire time is a bisect on that table. Fire times depend only on the
+    clock, so restarts never shift the posting cadence.
+    """
+    
+    __slots__ = ('slots', 'timezone')
+    
+    def __init__(self, slots, timezone=Config.SCHEDULER_TIMEZONE):
+        if not slots:
+            raise ValueError("PostingSlotTrigger needs at least one slot")
+        self.slots = tuple(sorted(set(slots)))
+        self.timezone = pytz.timezone(timezone) if isinstance(timezone, str) else timezone
+    
+    def get_next_fire_time(self, previous_fire_time, now):
+        # Same start rule as CronTrigger, so missed slots can be caught up
+        if previous_fire_time:
+            start = min(now, previous_fire_time + timedelta(microseconds=1))
+            if start == previous_fire_time:
+                start += timedelta(microseconds=1)
+        else:
+            start = now
+        
+        local_start = start.astimezone(self.timezone)
+        day = local_start.date()
+        minute_of_day = local_start.hour * 60 + local_start.minute
+        # A slot in the current minute is still due if its exact start has not passed
+        if local_start.second or local_start.microsecond:
+            minute_of_day += 1
+        
+        index = bisect_left(self.slots, minute_of_day)
+        if index == len(self.slots):
+            day += timedelta(days=1)
+            index = 0
+        
+        slot = self.slots[index]
+        naive = datetime(day.year, day.month, day.day, slot // 60, slot % 60)
+        return self.timezone.normalize(self.timezone.localize(naive))
+    
+    def __getstate__(self):
+        return {'version': 1, 'slots': self.slots, 'timezone': self.timezone.zone}
+    
+    def __setstate__(self, state):
+        self.slots = tuple(state['slots'])
+        self.timezone = pytz.timezone(state['timezone'])
+    
+    def __str__(self):
+        times = ', '.join(f"{slot // 60:02d}:{slot % 60:02d}" for slot in self.slots)
+        return f"slots[{times}] ({self.timezone.zone})"
+    
+    def __repr__(self):
+        return f"<{self.__class__.__name__} ({self})>"
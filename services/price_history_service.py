@@ -0,0 +1,128 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import insert, event, func, select
+from app import db
+from models import PriceHistory, Product
+
+logger = logging.getLogger(__name__)
+
+# Drop (in percent of the previous price) that makes a change worth posting
+PRICE_DROP_ALERT_PERCENT = float(os.environ.get("PRICE_DROP_ALERT_PERCENT", "15"))
+
+# Callables receiving the product ids with a qualifying drop, after commit
+price_drop_listeners = []
+
+def register_price_drop_listener(listener):
+    """Call listener(product_ids) whenever committed ingest data contains qualifying price drops"""
+    if listener not in price_drop_listeners:
+        price_drop_listeners.append(listener)
+
+@event.listens_for(db.session, 'after_commit')
+def notify_price_drops(session):
+    product_ids = session.info.pop('price_drop_product_ids', None)
+    if not product_ids:
+        return
+    
+    for listener in price_drop_listeners:
+        try:
+            listener(sorted(product_ids))
+        except Exception as e:
+            logger.error(f"Error notifying price drop listener: {e}")
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_price_drops(session):
+    session.info.pop('price_drop_product_ids', None)
+
+class PriceHistoryService:
+    """Service for recording and querying product price changes"""
+    
+    def record_changes(self, changes):
+        """Append one history row per price change
+        
+        changes are dicts with product_id, price, original_price, discount and
+        previous_price (None for a product seen for the first time). Does not
+        commit, so rows land in the same transaction as the product write.
+        Drops of at least PRICE_DROP_ALERT_PERCENT are announced to the
+        registered listeners after that transaction commits.
+        """
+        if not changes:
+            return 0
+        
+        now = datetime.utcnow()
+        rows = []
+        for change in changes:
+            previous_price = change.get('previous_price')
+            drop_percent = 0.0
+            if previous_price:
+                drop_percent = round((previous_price - change['price']) / previous_price * 100, 2)
+            
+            rows.append({
+                'product_id': change['product_id'],
+                'price': change['price'],
+                'original_price': change.get('original_price'),
+                'discount': change.get('discount') or 0,
+                'previous_price': previous_price,
+                'drop_percent': drop_percent,
+                'recorded_at': now
+            })
+        
+        db.session.execute(insert(PriceHistory), rows)
+        
+        # Listeners only hear about drops once the transaction commits
+        drops = {row['product_id'] for row in rows if row['drop_percent'] >= PRICE_DROP_ALERT_PERCENT}
+        if drops:
+            db.session.info.setdefault('price_drop_product_ids', set()).update(drops)
+        
+        return len(rows)
+    
+    def get_price_drops(self, min_drop_percent=10, hours=24, limit=100):
+        """Get active products whose price dropped at least min_drop_percent over the last hours
+        
+        Returns (product, start_price, drop_percent) tuples, one per product,
+        comparing the current price with the price before the first change in
+        the window. Changes are found with the (recorded_at, drop_percent)
+        index, so the cost depends on the number of recent changes and not on
+        the catalog size.
+        """
+        try:
+            since = datetime.utcnow() - timedelta(hours=hours)
+            
+            # The price at the start of the window is the one the window's first change replaced
+            ranked = select(
+                PriceHistory.product_id,
+                func.coalesce(PriceHistory.previous_price, PriceHistory.price).label('start_price'),
+                func.row_number().over(
+                    partition_by=PriceHistory.product_id,
+                    order_by=(PriceHistory.recorded_at, PriceHistory.id)
+                ).label('position')
+            ).where(PriceHistory.recorded_at >= since).subquery()
+            
+            drop_percent = (ranked.c.start_price - Product.price) / ranked.c.start_price * 100
+            rows = db.session.query(Product, ranked.c.start_price, drop_percent).join(
+                ranked, ranked.c.product_id == Product.id
+            ).filter(
+                ranked.c.position == 1,
+                ranked.c.start_price > 0,
+                drop_percent >= min_drop_percent,
+                Product.is_active == True
+            ).order_by(
+                drop_percent.desc()
+            ).limit(limit).all()
+            
+            return [(product, start_price, round(drop, 2)) for product, start_price, drop in rows]
+        
+        except Exception as e:
+            logger.error(f"Error getting price drops: {e}")
+            return []
+    
+    def get_product_history(self, product_id, limit=50):
+        """Get the most recent price changes of a product"""
+        try:
+            return PriceHistory.query.filter_by(product_id=product_id).order_by(
+                PriceHistory.recorded_at.desc()
+            ).limit(limit).all()
+        
+        except Exception as e:
+            logger.error(f"Error getting price history for product {product_id}: {e}")
+            return []
@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models import Product
+from services.price_history_service import PriceHistoryService
+
+logger = logging.getLogger(__name__)
+
+# Rows resolved and written per statement
+UPSERT_CHUNK_SIZE = 500
+# Fields whose changes are appended to the price history
+PRICE_FIELDS = ('price', 'original_price', 'discount')
+
+class ProductIngestService:
+    """Service for set-based Product upserts keyed on shopee_id"""
+    
+    def __init__(self, chunk_size=UPSERT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.price_history_service = PriceHistoryService()
+    
+    def bulk_upsert(self, rows, update_fields=(), on_insert=None, insert_inactive=False):
+        """Insert new products and update changed ones in chunks
+        
+        rows are dicts of Product column values that must include shopee_id.
+        Only update_fields are compared and overwritten on existing products;
+        with no update_fields existing products are left untouched. on_insert
+        may return extra column values (rating, affiliate link...) that are
+        only computed for products that do not exist yet.
+        
+        New products and changed prices are appended to the price history.
+        
+        Returns a dict with inserted, updated and unchanged counts plus the
+        list of inserted shopee_ids. Does not commit.
+        """
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'inserted_ids': []}
+        update_fields = tuple(update_fields)
+        
+        # Last value wins when the same item shows up twice
+        unique_rows = list({row['shopee_id']: row for row in rows}.values())
+        
+        for start in range(0, len(unique_rows), self.chunk_size):
+            chunk = unique_rows[start:start + self.chunk_size]
+            existing = self.load_existing(chunk, update_fields)
+            
+            to_insert = []
+            to_update = []
+            price_changes = []
+            for row in chunk:
+                current = existing.get(row['shopee_id'])
+                if current is None:
+                    if row.get('is_active', True) or insert_inactive:
+                        to_insert.append(dict(row, **(on_insert(row) if on_insert else {})))
+                elif any(current[field] != row[field] for field in update_fields):
+                    to_update.append(dict(row, id=current['id']))
+                    if any(current[field] != row[field] for field in PRICE_FIELDS if field in update_fields):
+                        price_changes.append(self.price_change(current['id'], row, current['price']))
+                else:
+                    stats['unchanged'] += 1
+            
+            self.write_chunk(to_insert, to_update, update_fields)
+            
+            # First observation of every new product
+            if to_insert:
+                new_ids = self.load_ids([row['shopee_id'] for row in to_insert])
+                price_changes.extend(
+                    self.price_change(new_ids[row['shopee_id']], row) for row in to_insert if row['shopee_id'] in new_ids
+                )
+            self.price_history_service.record_changes(price_changes)
+            
+            stats['inserted'] += len(to_insert)
+            stats['updated'] += len(to_update)
+            stats['inserted_ids'].extend(row['shopee_id'] for row in to_insert)
+        
+        logger.debug(f"Bulk upsert: {stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged")
+        return stats
+    
+    def price_change(self, product_id, row, previous_price=None):
+        return {
+            'product_id': product_id,
+            'price': row['price'],
+            'original_price': row.get('original_price'),
+            'discount': row.get('discount'),
+            'previous_price': previous_price
+        }
+    
+    def load_ids(self, shopee_ids):
+        """Map shopee_ids to Product ids"""
+        results = db.session.execute(
+            db.select(Product.id, Product.shopee_id).where(Product.shopee_id.in_(shopee_ids))
+        )
+        return {shopee_id: product_id for product_id, shopee_id in results}
+    
+    def load_existing(self, chunk, update_fields):
+        """Resolve the existing products of a chunk with a single IN query"""
+        fields = list(dict.fromkeys(update_fields + PRICE_FIELDS))
+        columns = [Product.id, Product.shopee_id] + [getattr(Product, field) for field in fields]
+        results = db.session.execute(
+            db.select(*columns).where(Product.shopee_id.in_([row['shopee_id'] for row in chunk]))
+        ).mappings()
+        
+        return {result['shopee_id']: result for result in results}
+    
+    def write_chunk(self, to_insert, to_update, update_fields):
+        """Write a resolved chunk with dialect-native upserts where available"""
+        if not to_insert and not to_update:
+            return
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = dialect_insert(Product)
+            if update_fields:
+                # Rows inserted concurrently by another worker are updated instead of failing
+                set_ = {field: stmt.excluded[field] for field in update_fields}
+                set_['updated_at'] = datetime.utcnow()
+                stmt = stmt.on_conflict_do_update(index_elements=['shopee_id'], set_=set_)
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=['shopee_id'])
+            
+            # Each executemany batch needs rows with the same keys
+            if to_insert:
+                db.session.execute(stmt, to_insert)
+            if to_update:
+                db.session.execute(stmt, [{k: v for k, v in row.items() if k != 'id'} for row in to_update])
+            return
+        
+        # Generic fallback for other databases
+        if to_insert:
+            db.session.execute(insert(Product), to_insert)
+        if to_update:
+            values = {field: bindparam(f'new_{field}') for field in update_fields}
+            values['updated_at'] = datetime.utcnow()
+            db.session.execute(
+                update(Product.__table__).where(Product.id == bindparam('_id')).values(**values),
+                [dict({f'new_{field}': row[field] for field in update_fields}, _id=row['id']) for row in to_update]
+            )
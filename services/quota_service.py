@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from config import Config
+from models import Post, PostQuota, ScheduleConfig
+
+logger = logging.getLogger(__name__)
+
+# Daily limit of platforms without a schedule
+DEFAULT_MAX_POSTS_PER_DAY = 4
+
+class QuotaService:
+    """Service for per-platform daily post counters
+    
+    A post counts towards the day it is scheduled for, in the posting
+    schedule's timezone, and every post of a day shares the platform's
+    max_posts_per_day, whether it comes from a posting slot, a price drop
+    or a campaign. A counter is changed in the same transaction that
+    creates or cancels posts, and seeded from the post table by an indexed
+    range count the first time a day is used.
+    """
+    
+    def __init__(self, timezone=Config.SCHEDULER_TIMEZONE):
+        self.timezone = pytz.timezone(timezone)
+    
+    def day_for(self, moment=None):
+        """Schedule-timezone date of a naive UTC datetime, now by default"""
+        moment = moment or datetime.utcnow()
+        return pytz.UTC.localize(moment).astimezone(self.timezone).date()
+    
+    def day_bounds(self, day):
+        """Naive UTC start and end of a schedule-timezone date"""
+        start = self.timezone.localize(datetime(day.year, day.month, day.day))
+        end = self.timezone.localize(datetime(day.year, day.month, day.day) + timedelta(days=1))
+        return (
+            start.astimezone(pytz.UTC).replace(tzinfo=None),
+            end.astimezone(pytz.UTC).replace(tzinfo=None)
+        )
+    
+    def used(self, platform, day=None):
+        """Posts scheduled on a platform for a day, today by default
+        
+        Read-only: a day without a counter yet is counted from the post
+        table, and the counter is created by the first post of that day.
+        """
+        day = day or self.day_for()
+        count = db.session.execute(
+            select(PostQuota.count).where(PostQuota.platform == platform, PostQuota.day == day)
+        ).scalar()
+        if count is None:
+            count = self.count_posts(platform, day)
+        return count
+    
+    def daily_limit(self, platform):
+        """The platform's max_posts_per_day"""
+        schedule_config = ScheduleConfig.query.filter_by(platform=platform).first()
+        return schedule_config.max_posts_per_day if schedule_config else DEFAULT_MAX_POSTS_PER_DAY
+    
+    def increment(self, post):
+        """Count a new post; call after adding it to the session and before committing"""
+        db.session.flush()
+        self.add(post.platform, self.day_for(post.scheduled_time or post.created_at), 1)
+    
+    def add(self, platform, day, amount):
+        """Count amount posts already flushed to the session for a platform and day"""
+        result = db.session.execute(
+            update(PostQuota.__table__).where(
+                PostQuota.platform == platform,
+                PostQuota.day == day
+            ).values(count=PostQuota.count + amount)
+        )
+        if not result.rowcount:
+            # First posts of the day: the count taken from the posts includes the new ones
+            self.reconcile(platform, day)
+    
+    def decrement(self, post):
+        """Give back the quota of a cancelled post; call before committing the cancellation"""
+        db.session.execute(
+            update(PostQuota.__table__).where(
+                PostQuota.platform == post.platform,
+                PostQuota.day == self.day_for(post.scheduled_time or post.created_at),
+                PostQuota.count > 0
+            ).values(count=PostQuota.count - 1)
+        )
+    
+    def count_posts(self, platform, day):
+        """Posts scheduled on a platform for a day, counted with ix_post_platform_scheduled"""
+        start, end = self.day_bounds(day)
+        return db.session.execute(
+            select(func.count(Post.id)).where(
+                Post.platform == platform,
+                Post.scheduled_time >= start,
+                Post.scheduled_time < end,
+                Post.status != 'cancelled'
+            )
+        ).scalar()
+    
+    def reconcile(self, platform, day):
+        """Reset a day's counter from the post table, without committing; returns the count"""
+        db.session.flush()
+        count = self.count_posts(platform, day)
+        table = PostQuota.__table__
+        result = db.session.execute(
+            update(table).where(table.c.platform == platform, table.c.day == day).values(count=count)
+        )
+        if not result.rowcount:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert().values(platform=platform, day=day, count=count))
+            except IntegrityError:
+                # Created by another process meanwhile
+                db.session.execute(
+                    update(table).where(table.c.platform == platform, table.c.day == day).values(count=count)
+                )
+        return count
+
+quota_service = QuotaService()
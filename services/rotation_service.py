@@ -0,0 +1,206 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models import Post, Product, ProductRotation, SyncCheckpoint
+
+logger = logging.getLogger(__name__)
+
+ROTATION_PLATFORMS = ('instagram', 'facebook', 'twitter')
+# A product is not picked again for a platform within this window
+ROTATION_COOLDOWN = timedelta(days=7)
+# Same bar as ShopeeService.get_trending_products_for_posting
+ROTATION_MIN_RATING = 4.0
+ROTATION_MIN_SOLD_COUNT = 100
+ROTATION_CHUNK_SIZE = 1000
+
+# Rows committed out of id or timestamp order are caught by re-reading this much before the watermark
+REFILL_OVERLAP = timedelta(minutes=5)
+
+PRODUCTS_CHECKPOINT = "product_rotation_products"
+POSTS_CHECKPOINT = "product_rotation_posts"
+
+class RotationService:
+    """Service for the per-platform queue of products to post next
+    
+    The queue holds one row per eligible product and platform, ranked by
+    sales and rating, with the time until which the product rests after
+    being posted. It is refilled incrementally from products changed and
+    posts created since the last refill, tracked with sync checkpoints
+    (offset holds the highest id seen, watermark the last refill time).
+    Ids and timestamps can commit out of order, so each refill re-reads
+    REFILL_OVERLAP before the watermark; applying a row twice is harmless.
+    """
+    
+    def next_product(self, platform):
+        """Take the best-ranked product that is not resting, without committing
+        
+        The product starts its cooldown in the caller's transaction, so it
+        is only consumed when the post is created.
+        """
+        self.refill()
+        now = datetime.utcnow()
+        
+        # Walks ix_product_rotation_rank from the top, skipping only the few resting products
+        entry = ProductRotation.query.filter(
+            ProductRotation.platform == platform,
+            or_(ProductRotation.cooldown_until.is_(None), ProductRotation.cooldown_until <= now)
+        ).order_by(ProductRotation.score.desc()).first()
+        
+        if not entry:
+            # Every eligible product was posted recently, so take the one that rested longest
+            entry = ProductRotation.query.filter_by(platform=platform).order_by(
+                ProductRotation.cooldown_until
+            ).first()
+        if not entry:
+            return None
+        
+        entry.cooldown_until = now + ROTATION_COOLDOWN
+        return db.session.get(Product, entry.product_id)
+    
+    def refill(self):
+        """Apply product and post changes since the last refill to the queue"""
+        try:
+            self.refill_products()
+            self.refill_cooldowns()
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Error refilling product rotation: {e}")
+            db.session.rollback()
+    
+    def checkpoint(self, name):
+        checkpoint = SyncCheckpoint.query.filter_by(name=name).first()
+        if not checkpoint:
+            checkpoint = SyncCheckpoint(name=name, offset=0)
+            db.session.add(checkpoint)
+        return checkpoint
+    
+    def score(self, sold_count, rating):
+        """Rank by sales, then rating, like the trending product list"""
+        return (sold_count or 0) + (rating or 0.0) / 10
+    
+    def is_eligible(self, product):
+        return bool(product.is_active) and (product.rating or 0) >= ROTATION_MIN_RATING \
+            and (product.sold_count or 0) >= ROTATION_MIN_SOLD_COUNT
+    
+    def refill_products(self):
+        """Add, rescore or drop products created or updated since the last refill"""
+        checkpoint = self.checkpoint(PRODUCTS_CHECKPOINT)
+        started = int(time.time())
+        last_id = checkpoint.offset or 0
+        
+        query = select(Product.id, Product.is_active, Product.rating, Product.sold_count)
+        if checkpoint.watermark:
+            # New ids catch bulk inserts that set an older updated_at
+            query = query.where(or_(
+                Product.updated_at >= datetime.utcfromtimestamp(checkpoint.watermark) - REFILL_OVERLAP,
+                Product.id > last_id
+            ))
+        
+        changed = 0
+        for rows in db.session.execute(query.execution_options(yield_per=ROTATION_CHUNK_SIZE)).partitions():
+            eligible = [row for row in rows if self.is_eligible(row)]
+            self.upsert_entries([
+                {'platform': platform, 'product_id': row.id, 'score': self.score(row.sold_count, row.rating)}
+                for row in eligible for platform in ROTATION_PLATFORMS
+            ])
+            
+            dropped = [row.id for row in rows if not self.is_eligible(row)]
+            if dropped:
+                db.session.execute(ProductRotation.__table__.delete().where(ProductRotation.product_id.in_(dropped)))
+            
+            last_id = max(last_id, max(row.id for row in rows))
+            changed += len(rows)
+        
+        checkpoint.offset = last_id
+        checkpoint.watermark = started
+        checkpoint.updated_at = datetime.utcnow()
+        if changed:
+            logger.info(f"Refreshed {changed} products in the rotation")
+    
+    def upsert_entries(self, entries):
+        """Insert queue entries or update their score, keeping their cooldown"""
+        if not entries:
+            return
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = dialect_insert(ProductRotation)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['platform', 'product_id'],
+                set_={'score': stmt.excluded.score}
+            )
+            db.session.execute(stmt, entries)
+            return
+        
+        # Generic fallback for other databases
+        table = ProductRotation.__table__
+        existing = set(db.session.execute(
+            select(table.c.platform, table.c.product_id).where(
+                table.c.product_id.in_({entry['product_id'] for entry in entries})
+            )
+        ).tuples())
+        to_update = [entry for entry in entries if (entry['platform'], entry['product_id']) in existing]
+        to_insert = [entry for entry in entries if (entry['platform'], entry['product_id']) not in existing]
+        if to_update:
+            db.session.execute(
+                update(table).where(
+                    table.c.platform == bindparam('_platform'),
+                    table.c.product_id == bindparam('_product_id')
+                ).values(score=bindparam('new_score')),
+                [{'_platform': e['platform'], '_product_id': e['product_id'], 'new_score': e['score']} for e in to_update]
+            )
+        if to_insert:
+            db.session.execute(table.insert(), to_insert)
+    
+    def refill_cooldowns(self):
+        """Rest products posted by any path since the last refill
+        
+        A product rests from the time its post goes out, so posts scheduled
+        ahead keep it out of the rotation until a cooldown after that time.
+        """
+        checkpoint = self.checkpoint(POSTS_CHECKPOINT)
+        started = int(time.time())
+        last_id = checkpoint.offset or 0
+        
+        posted_at = func.coalesce(Post.scheduled_time, Post.created_at)
+        query = select(Post.id, Post.platform, Post.product_id, posted_at.label('posted_at')).where(
+            Post.status != 'cancelled'
+        )
+        if checkpoint.watermark:
+            # Served by the primary key and ix_post_created_at; no ORDER BY, which would scan the table
+            query = query.where(or_(
+                Post.id > last_id,
+                Post.created_at >= datetime.utcfromtimestamp(checkpoint.watermark) - REFILL_OVERLAP
+            ))
+        else:
+            # First refill: only posts recent enough to still rest their product matter
+            query = query.where(posted_at >= datetime.utcnow() - ROTATION_COOLDOWN)
+            last_id = db.session.execute(select(func.max(Post.id))).scalar() or 0
+        
+        table = ProductRotation.__table__
+        rest = update(table).where(
+            table.c.platform == bindparam('_platform'),
+            table.c.product_id == bindparam('_product_id'),
+            or_(table.c.cooldown_until.is_(None), table.c.cooldown_until < bindparam('until'))
+        ).values(cooldown_until=bindparam('until'))
+        
+        for rows in db.session.execute(query.execution_options(yield_per=ROTATION_CHUNK_SIZE)).partitions():
+            latest = {}
+            for row in rows:
+                key = (row.platform, row.product_id)
+                latest[key] = max(latest.get(key, row.posted_at), row.posted_at)
+            db.session.execute(rest, [
+                {'_platform': platform, '_product_id': product_id, 'until': latest_at + ROTATION_COOLDOWN}
+                for (platform, product_id), latest_at in latest.items()
+            ])
+            last_id = max(last_id, max(row.id for row in rows))
+        
+        checkpoint.offset = last_id
+        checkpoint.watermark = started
+        checkpoint.updated_at = datetime.utcnow()
+
+rotation_service = RotationService()
@@ -0,0 +1,106 @@
+import atexit
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import app, scheduler, db
+from models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# auto: processes elect one leader that runs the jobs; follower: never run jobs
+SCHEDULER_MODE = os.environ.get("SCHEDULER_MODE", "auto")
+SCHEDULER_LEASE_NAME = "scheduler"
+# A leader that stops renewing loses the lease after LEASE_TTL_SECONDS
+LEASE_TTL_SECONDS = 60
+LEASE_RENEW_SECONDS = 15
+
+class SchedulerLeader:
+    """Runs scheduled jobs in a single process holding a database lease
+    
+    Every process starts the scheduler paused, so it can still add, change
+    and list jobs in the shared job store. The process holding the lease
+    resumes its scheduler; the others take over once the lease expires.
+    """
+    
+    def __init__(self, mode=SCHEDULER_MODE):
+        self.mode = mode
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.stopped = threading.Event()
+    
+    def start(self):
+        """Start the scheduler paused and, unless following, campaign for the lease"""
+        scheduler.start(paused=True)
+        if self.mode == 'follower':
+            logger.info("Scheduler running as follower, jobs run in the leader process")
+            return
+        
+        atexit.register(self.stop)
+        threading.Thread(target=self.run, name="scheduler-leader", daemon=True).start()
+    
+    def run(self):
+        with app.app_context():
+            while not self.stopped.is_set():
+                self.step()
+                self.stopped.wait(LEASE_RENEW_SECONDS)
+    
+    def step(self):
+        """Acquire or renew the lease and pause or resume the scheduler to match"""
+        leader = self.try_acquire()
+        if leader and not self.is_leader:
+            logger.info(f"Acquired the scheduler lease as {self.holder}, running scheduled jobs")
+            scheduler.resume()
+        elif not leader and self.is_leader:
+            logger.warning("Lost the scheduler lease, pausing scheduled jobs")
+            scheduler.pause()
+        elif leader:
+            # Pick up jobs other processes added to the shared job store
+            scheduler.wakeup()
+        self.is_leader = leader
+    
+    def try_acquire(self):
+        """Take the lease when free or expired, or extend it when already held"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=LEASE_TTL_SECONDS)
+        lease = SchedulerLease.__table__
+        try:
+            with db.engine.begin() as connection:
+                result = connection.execute(
+                    update(lease).where(
+                        lease.c.name == SCHEDULER_LEASE_NAME,
+                        or_(lease.c.holder == self.holder, lease.c.expires_at < now)
+                    ).values(holder=self.holder, expires_at=expires_at)
+                )
+                if result.rowcount:
+                    return True
+                
+                if connection.execute(select(lease.c.name).where(lease.c.name == SCHEDULER_LEASE_NAME)).first():
+                    return False
+                connection.execute(insert(lease).values(name=SCHEDULER_LEASE_NAME, holder=self.holder, expires_at=expires_at))
+                return True
+        
+        except IntegrityError:
+            # Another process created the lease first
+            return False
+        except Exception as e:
+            logger.error(f"Error renewing scheduler lease: {e}")
+            return False
+    
+    def stop(self):
+        """Stop campaigning and hand the lease over right away"""
+        self.stopped.set()
+        if not self.is_leader:
+            return
+        try:
+            with app.app_context(), db.engine.begin() as connection:
+                connection.execute(delete(SchedulerLease.__table__).where(SchedulerLease.holder == self.holder))
+            self.is_leader = False
+        except Exception as e:
+            logger.error(f"Error releasing scheduler lease: {e}")
+
+scheduler_leader = SchedulerLeader()
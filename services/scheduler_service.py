@@ -1,14 +1,23 @@
 import logging
 from datetime import datetime, timedelta
+from sqlalchemy import update
 from app import app, scheduler, db
 from models import ScheduleConfig, Product, Post, SocialMediaAccount
 from services.social_media_service import SocialMediaService
 from services.shopee_service import ShopeeService
-import random
-import pytz
+from services.price_history_service import register_price_drop_listener
+from services.posting_slots import PostingSlotTrigger, slots_for_schedule
+from services.quota_service import quota_service
+from services.rotation_service import rotation_service
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# A product is not posted again on a platform for a price drop within this window
+PRICE_DROP_REPOST_HOURS = 24
+# A slot missed while no process held the scheduler lease still runs this late
+SLOT_MISFIRE_GRACE_SECONDS = 15 * 60
+
 class SchedulerService:
     """Service for handling post scheduling"""
     
@@ -46,7 +55,7 @@ class SchedulerService:
             logger.error(f"Error initializing schedules: {e}")
     
     def schedule_posts_for_platform(self, platform):
-        """Schedule automated posts for a specific platform"""
+        """Schedule automated posts for a platform at its posting times"""
         try:
             with app.app_context():
                 # Remove existing jobs for this platform
@@ -76,17 +85,19 @@ class SchedulerService:
                     logger.warning(f"No active account found for {platform}")
                     return False
                 
-                # Schedule posts based on interval
+                # Schedule posts at the configured slots; one job per platform
+                trigger = PostingSlotTrigger(slots_for_schedule(schedule_config))
                 scheduler.add_job(
                     id=job_id,
-                    func=self.create_scheduled_post,
-                    trigger='interval',
-                    hours=schedule_config.interval_hours,
+                    func=run_scheduled_post,
+                    trigger=trigger,
                     args=[platform],
-                    next_run_time=pytz.UTC.localize(datetime.utcnow() + timedelta(minutes=1))  # Start in 1 minute
+                    replace_existing=True,
+                    coalesce=True,
+                    misfire_grace_time=SLOT_MISFIRE_GRACE_SECONDS
                 )
                 
-                logger.info(f"Scheduled posts for {platform} every {schedule_config.interval_hours} hours")
+                logger.info(f"Scheduled posts for {platform} at {trigger}")
                 return True
                 
         except Exception as e:
@@ -98,42 +109,17 @@ class SchedulerService:
         try:
             with app.app_context():
                 # Check daily post limit
-                today = datetime.now().date()
-                today_posts = Post.query.filter(
-                    Post.platform == platform,
-                    db.func.date(Post.created_at) == today
-                ).count()
-                
-                schedule_config = ScheduleConfig.query.filter_by(platform=platform).first()
-                max_posts = schedule_config.max_posts_per_day if schedule_config else 4
-                
-                if today_posts >= max_posts:
-                    logger.info(f"Daily post limit reached for {platform} ({today_posts}/{max_posts})")
+                if self.has_reached_daily_limit(platform):
                     return
                 
-                # Get a trending product for posting
-                products = self.shopee_service.get_trending_products_for_posting(limit=10)
+                # Take the best-ranked product that was not posted recently
+                selected_product = rotation_service.next_product(platform)
                 
-                if not products:
+                if not selected_product:
                     logger.warning(f"No products available for posting on {platform}")
                     return
                 
-                # Select a random product that hasn't been posted recently
-                recent_product_ids = [
-                    p.product_id for p in Post.query.filter(
-                        Post.platform == platform,
-                        Post.created_at >= datetime.now() - timedelta(days=7)
-                    ).all()
-                ]
-                
-                available_products = [p for p in products if p.id not in recent_product_ids]
-                
-                if not available_products:
-                    available_products = products  # Use any product if all were posted recently
-                
-                selected_product = random.choice(available_products)
-                
-                # Create the post
+                # Create the post; its commit also starts the product's cooldown
                 success = self.social_media_service.create_post(
                     selected_product, 
                     platform
@@ -147,8 +133,86 @@ class SchedulerService:
         except Exception as e:
             logger.error(f"Error creating scheduled post for {platform}: {e}")
     
+    def count_posts_today(self, platform):
+        """Count the posts scheduled for today, in the schedule timezone, for a platform"""
+        return quota_service.used(platform)
+    
+    def has_reached_daily_limit(self, platform):
+        """Check the platform's max_posts_per_day against today's posts, campaign posts included"""
+        today_posts = self.count_posts_today(platform)
+        max_posts = quota_service.daily_limit(platform)
+        
+        if today_posts >= max_posts:
+            logger.info(f"Daily post limit reached for {platform} ({today_posts}/{max_posts})")
+            return True
+        return False
+    
+    def enqueue_price_drop_posts(self, product_ids):
+        """Queue posts for products whose price just dropped
+        
+        Called after the ingest transaction commits; the posting itself runs
+        as a one-off scheduler job so the ingest request is not held up.
+        Jobs added by a follower process only reach the leader on its next
+        wakeup, so they never expire as misfired.
+        """
+        try:
+            scheduler.add_job(
+                id=f"price_drop_{uuid.uuid4().hex}",
+                func=run_price_drop_posts,
+                trigger='date',
+                args=[list(product_ids)],
+                coalesce=True,
+                misfire_grace_time=None
+            )
+            logger.info(f"Queued price drop posts for {len(product_ids)} products")
+        except Exception as e:
+            logger.error(f"Error queueing price drop posts: {e}")
+    
+    def post_price_drops(self, product_ids):
+        """Post price-dropped products to every active platform within its daily limit"""
+        try:
+            with app.app_context():
+                products = Product.query.filter(
+                    Product.id.in_(product_ids),
+                    Product.is_active == True
+                ).order_by(Product.discount.desc()).all()
+                
+                if not products:
+                    return 0
+                
+                created = 0
+                since = datetime.utcnow() - timedelta(hours=PRICE_DROP_REPOST_HOURS)
+                for account in SocialMediaAccount.query.filter_by(is_active=True).all():
+                    platform = account.platform
+                    recently_posted = {
+                        post.product_id for post in Post.query.filter(
+                            Post.platform == platform,
+                            Post.product_id.in_([p.id for p in products]),
+                            Post.created_at >= since
+                        ).all()
+                    }
+                    
+                    for product in products:
+                        if product.id in recently_posted:
+                            continue
+                        if self.has_reached_daily_limit(platform):
+                            break
+                        if self.social_media_service.create_post(product, platform):
+                            created += 1
+                
+                logger.info(f"Created {created} price drop posts")
+                return created
+                
+        except Exception as e:
+            logger.error(f"Error posting price drops: {e}")
+            return 0
+    
     def schedule_specific_post(self, product_id, platform, scheduled_time):
-        """Schedule a specific post for a specific time"""
+        """Schedule a specific post for a specific time
+        
+        The post dispatcher publishes scheduled posts once they are due, so
+        no scheduler job is needed per post.
+        """
         try:
             with app.app_context():
                 product = Product.query.get(product_id)
@@ -164,17 +228,6 @@ class SchedulerService:
                 )
                 
                 if success:
-                    # Schedule the actual posting job
-                    job_id = f"post_{product_id}_{platform}_{int(scheduled_time.timestamp())}"
-                    
-                    scheduler.add_job(
-                        id=job_id,
-                        func=self.execute_scheduled_post,
-                        trigger='date',
-                        run_date=scheduled_time,
-                        args=[product_id, platform]
-                    )
-                    
                     logger.info(f"Scheduled specific post for {platform} at {scheduled_time}")
                     return True
                 
@@ -184,51 +237,6 @@ class SchedulerService:
             logger.error(f"Error scheduling specific post: {e}")
             return False
     
-    def execute_scheduled_post(self, product_id, platform):
-        """Execute a scheduled post"""
-        try:
-            with app.app_context():
-                # Find the scheduled post
-                post = Post.query.filter_by(
-                    product_id=product_id,
-                    platform=platform,
-                    status='scheduled'
-                ).order_by(Post.created_at.desc()).first()
-                
-                if not post:
-                    logger.error(f"Scheduled post not found for product {product_id} on {platform}")
-                    return
-                
-                # Get account
-                account = SocialMediaAccount.query.filter_by(
-                    platform=platform, 
-                    is_active=True
-                ).first()
-                
-                if not account:
-                    post.status = 'failed'
-                    post.error_message = f"No active account found for {platform}"
-                    db.session.commit()
-                    return
-                
-                # Execute the post
-                success = self.social_media_service.post_to_platform(post, account)
-                
-                if success:
-                    post.status = 'posted'
-                    post.posted_time = datetime.utcnow()
-                    post.post_id = f"{platform}_{random.randint(1000000, 9999999)}"
-                    post.engagement_data = self.social_media_service.generate_simulated_engagement(platform)
-                else:
-                    post.status = 'failed'
-                    post.error_message = "Failed to post to platform"
-                
-                db.session.commit()
-                logger.info(f"Executed scheduled post: {post.id}")
-                
-        except Exception as e:
-            logger.error(f"Error executing scheduled post: {e}")
-    
     def pause_platform_scheduling(self, platform):
         """Pause scheduling for a platform"""
         try:
@@ -278,15 +286,16 @@ class SchedulerService:
                 if not post or post.status != 'scheduled':
                     return False
                 
-                # Remove from scheduler if it has a job
-                job_id = f"post_{post.product_id}_{post.platform}_{int(post.scheduled_time.timestamp())}"
-                try:
-                    scheduler.remove_job(job_id)
-                except:
-                    pass  # Job doesn't exist or already executed
+                # Conditional, so a post the dispatcher just picked up is not cancelled
+                result = db.session.execute(
+                    update(Post.__table__).where(Post.id == post_id, Post.status == 'scheduled').values(status='cancelled')
+                )
+                if not result.rowcount:
+                    db.session.rollback()
+                    return False
                 
-                # Update post status
-                post.status = 'cancelled'
+                # Give its daily quota back
+                quota_service.decrement(post)
                 db.session.commit()
                 
                 logger.info(f"Cancelled scheduled post: {post_id}")
@@ -297,30 +306,25 @@ class SchedulerService:
             return False
     
     def update_engagement_data(self):
-        """Update engagement data for recent posts"""
-        try:
-            with app.app_context():
-                # Get posts from last 30 days
-                recent_posts = Post.query.filter(
-                    Post.status == 'posted',
-                    Post.posted_time >= datetime.now() - timedelta(days=30)
-                ).all()
-                
-                updated_count = 0
-                for post in recent_posts:
-                    if self.social_media_service.update_post_engagement(post.id):
-                        updated_count += 1
-                
-                logger.info(f"Updated engagement data for {updated_count} posts")
-                return updated_count
-                
-        except Exception as e:
-            logger.error(f"Error updating engagement data: {e}")
-            return 0
+        """Update engagement data for posts whose polling is due"""
+        from services.engagement_poller import engagement_poller
+        with app.app_context():
+            return engagement_poller.poll()
 
 # Initialize scheduler when module is imported
 scheduler_service = SchedulerService()
 
+def run_scheduled_post(platform):
+    """Scheduler entry point for posts at a platform's posting times"""
+    scheduler_service.create_scheduled_post(platform)
+
+def run_price_drop_posts(product_ids):
+    """Scheduler entry point for price drop posts"""
+    scheduler_service.post_price_drops(product_ids)
+
+# Post as soon as ingest detects a qualifying price drop
+register_price_drop_listener(scheduler_service.enqueue_price_drop_posts)
+
 # Schedule engagement data updates every hour
 # Disabled automatic scheduling to avoid timezone pickle issues
 # Will be initialized manually from the web interface
@@ -0,0 +1,41 @@
+import logging
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+from app import db
+
+logger = logging.getLogger(__name__)
+
+class SchemaService:
+    """Service for bringing existing databases up to date with the models"""
+    
+    def upgrade(self):
+        """Add model columns and indexes that existing tables are missing
+        
+        db.create_all() only creates missing tables. New columns must be
+        nullable or have a server_default so existing rows stay valid.
+        """
+        try:
+            inspector = inspect(db.engine)
+            dialect = db.engine.dialect
+            preparer = dialect.identifier_preparer
+            
+            with db.engine.begin() as connection:
+                for table in db.metadata.sorted_tables:
+                    if not inspector.has_table(table.name):
+                        continue
+                    
+                    existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                    for column in table.columns:
+                        if column.name not in existing_columns:
+                            ddl = CreateColumn(column).compile(dialect=dialect)
+                            connection.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                            logger.info(f"Added column {table.name}.{column.name}")
+                    
+                    existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+                    for index in table.indexes:
+                        if index.name not in existing_indexes:
+                            index.create(connection)
+                            logger.info(f"Created index {index.name}")
+        
+        except Exception as e:
+            logger.error(f"Error upgrading database schema: {e}")
@@ -0,0 +1,106 @@
+import logging
+import re
+from sqlalchemy import text, func, or_, Integer, Float
+from app import db
+from models import Product
+
+logger = logging.getLogger(__name__)
+
+# Title matches weigh more than description matches
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SQLITE_INDEX_DDL = [
+    # External-content FTS5 table; unicode61 folds accents so "tenis" finds "Tênis"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5("
+    " title, description, content='product', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS product_search_ai AFTER INSERT ON product BEGIN"
+    " INSERT INTO product_search (rowid, title, description) VALUES (new.id, new.title, new.description);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS product_search_ad AFTER DELETE ON product BEGIN"
+    " INSERT INTO product_search (product_search, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS product_search_au AFTER UPDATE OF title, description ON product BEGIN"
+    " INSERT INTO product_search (product_search, rowid, title, description)"
+    " VALUES ('delete', old.id, old.title, old.description);"
+    " INSERT INTO product_search (rowid, title, description) VALUES (new.id, new.title, new.description);"
+    " END",
+]
+
+POSTGRES_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is not immutable, so it is wrapped to be usable in an index expression
+    "CREATE OR REPLACE FUNCTION product_search_document(title text, description text)"
+    " RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$"
+    " SELECT setweight(to_tsvector('simple', public.unaccent('public.unaccent', coalesce(title, ''))), 'A')"
+    " || setweight(to_tsvector('simple', public.unaccent('public.unaccent', coalesce(description, ''))), 'B')"
+    " $$",
+    "CREATE INDEX IF NOT EXISTS ix_product_search_document ON product"
+    " USING GIN (product_search_document(title, description))",
+]
+
+class SearchService:
+    """Service for full-text product search"""
+    
+    def ensure_index(self):
+        """Create the search index for the current database if it does not exist yet
+        
+        SQLite keeps its FTS5 table in sync through triggers; Postgres uses an
+        expression index that is maintained by the database itself.
+        """
+        try:
+            dialect = db.engine.dialect.name
+            if dialect == 'sqlite':
+                with db.engine.begin() as connection:
+                    exists = connection.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'"
+                    )).first()
+                    for statement in SQLITE_INDEX_DDL:
+                        connection.execute(text(statement))
+                    if not exists:
+                        # Index the products stored before the search table existed
+                        connection.execute(text("INSERT INTO product_search (product_search) VALUES ('rebuild')"))
+            elif dialect == 'postgresql':
+                with db.engine.begin() as connection:
+                    for statement in POSTGRES_INDEX_DDL:
+                        connection.execute(text(statement))
+            else:
+                logger.info(f"Full-text search not available for {dialect}, using LIKE search")
+        
+        except Exception as e:
+            logger.error(f"Error creating product search index: {e}")
+    
+    def search_terms(self, search):
+        """Split user input into search terms, dropping query syntax characters"""
+        return re.findall(r'\w+', search.lower())
+    
+    def apply_search(self, query, search):
+        """Filter a Product query by a search string and order it by relevance"""
+        terms = self.search_terms(search)
+        if not terms:
+            return query
+        
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            # Every term must match, as a prefix so results show up while typing
+            match = ' '.join(f'"{term}"*' for term in terms)
+            ranked = text(
+                f"SELECT rowid AS product_id, bm25(product_search, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank"
+                " FROM product_search WHERE product_search MATCH :match"
+            ).bindparams(match=match).columns(product_id=Integer, rank=Float).subquery()
+            
+            return query.join(ranked, Product.id == ranked.c.product_id).order_by(ranked.c.rank, Product.id.desc())
+        
+        if dialect == 'postgresql':
+            document = func.product_search_document(Product.title, Product.description)
+            ts_query = func.to_tsquery('simple', func.unaccent(' & '.join(f'{term}:*' for term in terms)))
+            
+            return query.filter(document.op('@@')(ts_query)).order_by(
+                func.ts_rank(document, ts_query).desc(), Product.id.desc()
+            )
+        
+        for term in terms:
+            query = query.filter(or_(Product.title.contains(term), Product.description.contains(term)))
+        return query.order_by(Product.created_at.desc())
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# Sustained partner API budget for this process (requests per second); with
+# several gunicorn workers set it to the shop limit divided by the worker count
+SHOPEE_API_RATE_LIMIT = float(os.environ.get("SHOPEE_API_RATE_LIMIT", "10"))
+SHOPEE_API_BURST = int(os.environ.get("SHOPEE_API_BURST", "10"))
+
+# In-flight requests allowed per endpoint
+DEFAULT_ENDPOINT_CONCURRENCY = 4
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+
+# Error codes the partner API uses when a caller is being throttled
+THROTTLE_ERRORS = {"error_too_many_request", "error_rate_limit", "error_server_busy"}
+
+class ShopeeApiError(Exception):
+    """Raised when a Shopee partner API call fails"""
+
+class ShopeeRateLimitError(ShopeeApiError):
+    """Raised when a call is still throttled or unavailable after every retry"""
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every Shopee API call in the process"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it
+        
+        Tokens may go negative, so waiting callers are served in arrival order.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+    
+    def penalize(self, seconds):
+        """Push every caller back after the API signalled throttling"""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+    
+    def acquire(self):
+        time.sleep(self.reserve())
+    
+    async def acquire_async(self):
+        await asyncio.sleep(self.reserve())
+
+rate_limiter = TokenBucket(SHOPEE_API_RATE_LIMIT, SHOPEE_API_BURST)
+
+class ShopeeApiClient:
+    """asyncio client for the Shopee partner API with rate limiting and retries
+    
+    params_factory(api_path) must return freshly signed common parameters, so
+    each retry is sent with a new timestamp and signature. When a cache is
+    given, successful responses of cacheable endpoints are served from it.
+    """
+    
+    def __init__(self, session, base_url, params_factory, limiter=None, cache=None,
+                 max_concurrency=DEFAULT_ENDPOINT_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.session = session
+        self.cache = cache
+        self.base_url = base_url
+        self.params_factory = params_factory
+        self.limiter = limiter or rate_limiter
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.semaphores = weakref.WeakKeyDictionary()
+    
+    def run(self, coroutine):
+        """Run a client coroutine from synchronous code"""
+        return asyncio.run(coroutine)
+    
+    def request(self, api_path, params=None, timeout=30, use_cache=True):
+        """Synchronous wrapper around get()"""
+        return self.run(self.get(api_path, params, timeout, use_cache))
+    
+    async def get_many(self, api_path, params_list, timeout=15, use_cache=True):
+        """Send many calls to one endpoint concurrently
+        
+        Returns one result per params dict, in order; failed calls are
+        returned as their exception.
+        """
+        return await asyncio.gather(
+            *(self.get(api_path, params, timeout, use_cache) for params in params_list),
+            return_exceptions=True
+        )
+    
+    async def get(self, api_path, params=None, timeout=30, use_cache=True):
+        """Call an endpoint and return the "response" body of its payload"""
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self.cache.get(api_path, params)
+            if cached is not None:
+                return cached
+        
+        loop = asyncio.get_running_loop()
+        url = f"{self.base_url}{api_path}"
+        
+        async with self.semaphore(api_path):
+            for attempt in range(self.max_retries + 1):
+                await self.limiter.acquire_async()
+                
+                query = self.params_factory(api_path)
+                if not query:
+                    raise ShopeeApiError("Failed to create API signature")
+                query.update(params or {})
+                
+                try:
+                    response = await loop.run_in_executor(
+                        None, partial(self.session.get, url, params=query, timeout=timeout)
+                    )
+                except Exception as e:
+                    # Network errors are retried like server errors
+                    response = None
+                    failure = ShopeeApiError(f"Request to {api_path} failed: {e}")
+                else:
+                    failure = ShopeeRateLimitError(f"Shopee API {api_path} still throttled or unavailable after {self.max_retries} retries")
+                
+                delay = self.retry_delay(response, attempt)
+                if delay is None:
+                    body = self.parse_response(response)
+                    if use_cache:
+                        self.cache.set(api_path, params, body)
+                    return body
+                
+                if attempt == self.max_retries:
+                    raise failure
+                
+                logger.warning(f"Shopee API {api_path} throttled or unavailable, retrying in {delay:.1f}s")
+                self.limiter.penalize(delay)
+                await asyncio.sleep(delay)
+    
+    def semaphore(self, api_path):
+        """Concurrency cap for an endpoint, bound to the running event loop"""
+        loop_semaphores = self.semaphores.setdefault(asyncio.get_running_loop(), {})
+        if api_path not in loop_semaphores:
+            loop_semaphores[api_path] = asyncio.Semaphore(self.max_concurrency)
+        return loop_semaphores[api_path]
+    
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before retrying, or None when the call should not be retried"""
+        if response is not None:
+            throttled = response.status_code == 429 or self.error_code(response) in THROTTLE_ERRORS
+            if not throttled and response.status_code < 500:
+                return None
+            
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), BACKOFF_MAX_SECONDS)
+                except ValueError:
+                    pass
+        
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    
+    def error_code(self, response):
+        try:
+            return response.json().get("error")
+        except Exception:
+            return None
+    
+    def parse_response(self, response):
+        if response.status_code != 200:
+            raise ShopeeApiError(f"API request failed with status {response.status_code}: {response.text}")
+        
+        data = response.json()
+        
+        if data.get("error"):
+            raise ShopeeApiError(f"Shopee API error: {data.get('message', 'Unknown error')}")
+        
+        return data.get("response", {})
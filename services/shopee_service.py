@@ -5,12 +5,37 @@ import time
 import hmac
 import hashlib
 import os
+import pytz
 from datetime import datetime
-from app import db
-from models import Product, AffiliateConfig
+from requests.adapters import HTTPAdapter
+from sqlalchemy import or_, update, bindparam
+from app import app, scheduler, db
+from models import Product, AffiliateConfig, SyncCheckpoint
+from services.api_cache import ApiResponseCache
+from services.image_resolver import image_resolver
+from services.product_ingest_service import ProductIngestService
+from services.shopee_api_client import ShopeeApiClient, ShopeeRateLimitError
 
 logger = logging.getLogger(__name__)
 
+ITEM_LIST_PATH = "/api/v2/product/get_item_list"
+ITEM_BASE_INFO_PATH = "/api/v2/product/get_item_base_info"
+
+# get_item_base_info accepts at most 50 ids per call
+ITEM_BASE_INFO_BATCH_SIZE = 50
+# Upper bound on concurrent requests per endpoint
+DETAIL_FETCH_WORKERS = 4
+# get_item_list returns at most 100 items per page
+ITEM_LIST_PAGE_SIZE = 100
+# Product fields refreshed from the API on an incremental sync
+SYNCED_PRODUCT_FIELDS = ('title', 'price', 'original_price', 'discount', 'is_active')
+# Products read and written per round trip by catalog-wide jobs
+CATALOG_CHUNK_SIZE = 1000
+# How often prices, discounts and status of stored products are refreshed
+DELTA_SYNC_INTERVAL_MINUTES = int(os.environ.get("DELTA_SYNC_INTERVAL_MINUTES", "30"))
+
+DELTA_SYNC_JOB_ID = "shopee_delta_sync"
+
 class ShopeeService:
     """Service for handling Shopee product operations"""
     
@@ -22,7 +47,8 @@ class ShopeeService:
         ]
         
         # Shopee API Configuration
-        self.base_url = "https://partner.shopeemobile.com"
+        # SHOPEE_API_BASE_URL points the service at another host, like shopee_stub_server.py
+        self.base_url = os.environ.get("SHOPEE_API_BASE_URL", "https://partner.shopeemobile.com").rstrip("/")
         self.partner_id = os.environ.get("SHOPEE_PARTNER_ID")
         self.partner_key = os.environ.get("SHOPEE_PARTNER_KEY") 
         self.access_token = os.environ.get("SHOPEE_ACCESS_TOKEN")
@@ -30,19 +56,47 @@ class ShopeeService:
         
         # Flag to determine if we should use real API or simulated data
         self.use_real_api = bool(self.partner_id and self.partner_key and self.access_token and self.shop_id)
+        
+        # Pooled keep-alive session shared by every API call of this service
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DETAIL_FETCH_WORKERS, pool_maxsize=DETAIL_FETCH_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Local response cache, only opened when the real API is in use
+        self.cache = None
+        if self.use_real_api:
+            self.cache = ApiResponseCache(
+                os.environ.get("SHOPEE_API_CACHE_PATH", os.path.join(app.instance_path, "shopee_api_cache.db"))
+            )
+        
+        self.api_client = ShopeeApiClient(
+            self.session, self.base_url, self.build_signed_params,
+            cache=self.cache, max_concurrency=DETAIL_FETCH_WORKERS
+        )
+        self.ingest_service = ProductIngestService()
     
-    def fetch_trending_products(self, limit=20):
-        """Fetch trending products from Shopee API or use realistic simulation"""
+    def fetch_trending_products(self, limit=20, force_refresh=False):
+        """Fetch trending products from Shopee API or use realistic simulation
+        
+        force_refresh bypasses the local API response cache.
+        """
         try:
             if self.use_real_api:
                 logger.info("Using real Shopee API to fetch products")
-                return self.fetch_real_shopee_products(limit)
+                return self.fetch_real_shopee_products(limit, force_refresh)
             else:
                 logger.info("Using simulated Shopee products (configure API keys for real data)")
                 return self.fetch_simulated_products(limit)
+        except ShopeeRateLimitError as e:
+            # Simulated products would pollute a real catalog; try again on the next refresh
+            logger.warning(f"Shopee API is throttling requests, skipping this refresh: {e}")
+            return []
         except Exception as e:
             logger.error(f"Error fetching products: {e}")
-            # Fallback to simulated data if API fails
+            if self.use_real_api:
+                # Simulated products would pollute a real catalog; let the caller report the failure
+                raise
             return self.fetch_simulated_products(limit)
     
     def create_shopee_signature(self, api_path, timestamp, access_token, shop_id):
@@ -59,59 +113,35 @@ class ShopeeService:
             logger.error(f"Error creating signature: {e}")
             return None
     
-    def fetch_real_shopee_products(self, limit=20):
+    def build_signed_params(self, api_path):
+        """Build the common signed query parameters for a partner API call"""
+        timestamp = int(time.time())
+        signature = self.create_shopee_signature(api_path, timestamp, self.access_token, self.shop_id)
+        if not signature:
+            return None
+        
+        return {
+            "partner_id": self.partner_id,
+            "timestamp": timestamp,
+            "access_token": self.access_token,
+            "shop_id": self.shop_id,
+            "sign": signature
+        }
+    
+    def fetch_real_shopee_products(self, limit=20, force_refresh=False):
         """Fetch real products from Shopee Partner API"""
         try:
-            products = []
-            timestamp = int(time.time())
-            api_path = "/api/v2/product/get_item_list"
-            
-            # Create signature for authentication
-            signature = self.create_shopee_signature(api_path, timestamp, self.access_token, self.shop_id)
-            if not signature:
-                raise Exception("Failed to create API signature")
-            
-            # Request parameters
-            params = {
-                "partner_id": self.partner_id,
-                "timestamp": timestamp,
-                "access_token": self.access_token,
-                "shop_id": self.shop_id,
-                "sign": signature,
-                "page_size": min(limit, 100),  # API limit per request
-                "offset": 0,
-                "item_status": ["NORMAL"]  # Only active products
-            }
-            
-            # Make API request
-            url = f"{self.base_url}{api_path}"
-            response = requests.get(url, params=params, timeout=30)
-            
-            if response.status_code != 200:
-                raise Exception(f"API request failed with status {response.status_code}: {response.text}")
-            
-            data = response.json()
-            
-            if data.get("error"):
-                raise Exception(f"Shopee API error: {data.get('message', 'Unknown error')}")
-            
-            # Process each product from API response
-            item_list = data.get("response", {}).get("item", [])
-            
-            for item_data in item_list[:limit]:
-                try:
-                    # Get detailed product information
-                    product_detail = self.get_product_detail(item_data.get("item_id"))
-                    
-                    if product_detail:
-                        # Create product from real Shopee data
-                        product = self.create_product_from_api_data(product_detail)
-                        if product:
-                            products.append(product)
-                            
-                except Exception as e:
-                    logger.warning(f"Error processing product {item_data.get('item_id')}: {e}")
-                    continue
+            # Only the first page is needed for a trending refresh
+            item_list = self.request_item_list(
+                offset=0, page_size=min(limit, ITEM_LIST_PAGE_SIZE), use_cache=not force_refresh
+            ).get("item", [])[:limit]
+            
+            # Get detailed product information in batches and store only new products
+            details = self.get_product_details(
+                self.item_ids_of(item_list), self.update_times_of(item_list), force_refresh
+            )
+            stats = self.store_api_items(details)
+            products = self.get_products_by_shopee_ids(stats['inserted_ids'])
             
             if products:
                 db.session.commit()
@@ -123,103 +153,277 @@ class ShopeeService:
             logger.error(f"Error fetching real Shopee products: {e}")
             raise
     
-    def get_product_detail(self, item_id):
-        """Get detailed product information from Shopee API"""
+    def request_item_list(self, offset=0, page_size=ITEM_LIST_PAGE_SIZE, use_cache=True, **filters):
+        """Request one page of get_item_list and return its response body"""
+        params = {
+            "page_size": page_size,
+            "offset": offset,
+            "item_status": ["NORMAL"]  # Only active products
+        }
+        params.update(filters)
+        
+        return self.api_client.request(ITEM_LIST_PATH, params, timeout=30, use_cache=use_cache)
+    
+    def iter_item_list_pages(self, start_offset=0, page_size=ITEM_LIST_PAGE_SIZE, use_cache=True, **filters):
+        """Walk get_item_list page by page, yielding (items, next_offset)
+        
+        next_offset is None on the last page.
+        """
+        offset = start_offset
+        while True:
+            page = self.request_item_list(offset=offset, page_size=page_size, use_cache=use_cache, **filters)
+            items = page.get("item", [])
+            next_offset = page.get("next_offset", offset + len(items)) if page.get("has_next_page") else None
+            
+            yield items, next_offset
+            
+            if next_offset is None or not items:
+                break
+            offset = next_offset
+    
+    def item_ids_of(self, item_list):
+        return [item_data.get("item_id") for item_data in item_list if item_data.get("item_id")]
+    
+    def update_times_of(self, item_list):
+        """Map item ids to the update_time reported by get_item_list"""
+        return {item_data.get("item_id"): item_data.get("update_time") for item_data in item_list}
+    
+    def get_checkpoint(self, name):
+        """Get or create the named sync checkpoint"""
+        checkpoint = SyncCheckpoint.query.filter_by(name=name).first()
+        if not checkpoint:
+            checkpoint = SyncCheckpoint(name=name, offset=0)
+            db.session.add(checkpoint)
+            db.session.flush()
+        return checkpoint
+    
+    def crawl_full_catalog(self, page_size=ITEM_LIST_PAGE_SIZE, checkpoint_name="catalog_crawl", force_refresh=False, restart=False):
+        """Crawl every item of the shop, resuming from the last saved offset
+        
+        Each page is stored and committed together with the checkpoint as it
+        arrives, so an interrupted crawl continues where it stopped and memory
+        use does not grow with the catalog size. Started with crawl_catalog.py;
+        running it again resumes an interrupted crawl, restart starts over.
+        """
+        stats = {'pages': 0, 'items': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'finished': False}
         try:
-            timestamp = int(time.time())
-            api_path = "/api/v2/product/get_item_base_info"
-            
-            signature = self.create_shopee_signature(api_path, timestamp, self.access_token, self.shop_id)
-            if not signature:
-                return None
-            
-            params = {
-                "partner_id": self.partner_id,
-                "timestamp": timestamp,
-                "access_token": self.access_token,
-                "shop_id": self.shop_id,
-                "sign": signature,
-                "item_id_list": [item_id]
-            }
-            
-            url = f"{self.base_url}{api_path}"
-            response = requests.get(url, params=params, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if not data.get("error"):
-                    return data.get("response", {}).get("item_list", [{}])[0]
+            checkpoint = self.get_checkpoint(checkpoint_name)
+            if restart:
+                checkpoint.offset = 0
+            start_offset = checkpoint.offset or 0
+            if start_offset:
+                logger.info(f"Resuming catalog crawl from offset {start_offset}")
+            
+            for items, next_offset in self.iter_item_list_pages(start_offset, page_size, use_cache=not force_refresh):
+                details = self.get_product_details(self.item_ids_of(items), self.update_times_of(items), force_refresh)
+                
+                page_stats = self.store_api_items(details, SYNCED_PRODUCT_FIELDS)
+                for key in ('inserted', 'updated', 'unchanged'):
+                    stats[key] += page_stats[key]
+                
+                # A finished crawl starts over from the beginning next time
+                checkpoint.offset = next_offset or 0
+                checkpoint.updated_at = datetime.utcnow()
+                db.session.commit()
+                
+                stats['pages'] += 1
+                stats['items'] += len(items)
             
-            return None
+            logger.info(f"Catalog crawl finished: {stats['items']} items in {stats['pages']} pages, {stats['inserted']} new, {stats['updated']} updated")
+            stats['finished'] = True
+            return stats
             
         except Exception as e:
-            logger.warning(f"Error getting product detail for {item_id}: {e}")
-            return None
+            logger.error(f"Error crawling Shopee catalog (stopped after {stats['pages']} pages): {e}")
+            db.session.rollback()
+            return stats
+    
+    def get_product_detail(self, item_id):
+        """Get detailed product information from Shopee API"""
+        details = self.get_product_details([item_id])
+        return details[0] if details else None
+    
+    def get_product_details(self, item_ids, update_times=None, force_refresh=False):
+        """Get detailed information for many products using batched, concurrent requests
+        
+        Items are served from the response cache when fresh, or when their
+        update_time in update_times shows they have not changed since cached.
+        """
+        details = []
+        missing_ids = []
+        for item_id in item_ids:
+            cached = None
+            if self.cache and not force_refresh:
+                cached = self.cache.get(ITEM_BASE_INFO_PATH, {"item_id": item_id}, (update_times or {}).get(item_id))
+            if cached is not None:
+                details.append(cached)
+            else:
+                missing_ids.append(item_id)
+        
+        batches = [
+            missing_ids[i:i + ITEM_BASE_INFO_BATCH_SIZE]
+            for i in range(0, len(missing_ids), ITEM_BASE_INFO_BATCH_SIZE)
+        ]
+        if not batches:
+            return details
+        
+        # Items are cached one by one below, whatever batch they came in
+        results = self.api_client.run(self.api_client.get_many(
+            ITEM_BASE_INFO_PATH,
+            [{"item_id_list": ",".join(str(item_id) for item_id in batch)} for batch in batches],
+            timeout=15,
+            use_cache=False
+        ))
+        
+        for batch, result in zip(batches, results):
+            if isinstance(result, ShopeeRateLimitError):
+                raise result
+            if isinstance(result, Exception):
+                logger.warning(f"Error getting product details for batch of {len(batch)} items: {result}")
+                continue
+            for item in result.get("item_list", []):
+                if self.cache:
+                    self.cache.set(ITEM_BASE_INFO_PATH, {"item_id": item.get("item_id")}, item, item.get("update_time"))
+                details.append(item)
+        
+        return details
+    
+    def map_api_item(self, api_data):
+        """Map a get_item_base_info item to Product column values"""
+        item_id = api_data.get("item_id")
+        item_name = api_data.get("item_name", "Produto Shopee")
+        description = api_data.get("description", "")
+        
+        # Get price information
+        price_info = api_data.get("price_info", {})
+        current_price = float(price_info.get("current_price", 0)) / 100000  # Shopee uses 5 decimal places
+        original_price = float(price_info.get("original_price", current_price)) / 100000
+        
+        # Calculate discount
+        discount = 0
+        if original_price > current_price:
+            discount = int(((original_price - current_price) / original_price) * 100)
+        
+        # Get category
+        category_id = api_data.get("category_id")
+        category = self.map_shopee_category_to_local(category_id)
+        
+        # Get images (use first image)
+        image_info = api_data.get("image", {})
+        image_list = image_info.get("image_id_list", [])
+        image_url = ""
+        if image_list:
+            # Construct Shopee image URL
+            image_url = f"https://cf.shopee.com.br/file/{image_list[0]}"
+        
+        return {
+            'shopee_id': str(item_id),
+            'title': item_name[:255],  # Respect field length limits
+            'description': description[:1000] if description else "",
+            'price': round(current_price, 2),
+            'original_price': round(original_price, 2),
+            'discount': discount,
+            'category': category,
+            'image_url': image_url,
+            'product_url': f"https://shopee.com.br/product/{item_id}",
+            'is_active': api_data.get("item_status", "NORMAL") == "NORMAL"
+        }
     
-    def create_product_from_api_data(self, api_data):
-        """Create Product object from Shopee API data"""
+    def new_product_defaults(self, product_data, affiliate_id):
+        """Column values only computed for products that are not stored yet"""
+        return {
+            'rating': round(random.uniform(4.0, 5.0), 1),  # API might not provide rating
+            'sold_count': random.randint(100, 1000),  # API might not provide sales count
+            'affiliate_link': self.generate_affiliate_link(product_data['shopee_id'], affiliate_id)
+        }
+    
+    def store_api_items(self, items, update_fields=()):
+        """Map API items and upsert them in bulk; see ProductIngestService.bulk_upsert"""
+        rows = [self.map_api_item(api_data) for api_data in items]
+        affiliate_id = self.get_affiliate_id() or ''
+        return self.ingest_service.bulk_upsert(
+            rows, update_fields, on_insert=lambda row: self.new_product_defaults(row, affiliate_id)
+        )
+    
+    def get_products_by_shopee_ids(self, shopee_ids):
+        """Load the products with the given shopee ids"""
+        if not shopee_ids:
+            return []
+        return Product.query.filter(Product.shopee_id.in_(shopee_ids)).all()
+    
+    def schedule_delta_sync(self):
+        """Register the periodic delta sync job when the real API is configured"""
+        if not self.use_real_api:
+            return
+        try:
+            scheduler.add_job(
+                id=DELTA_SYNC_JOB_ID,
+                func=run_delta_sync,
+                trigger='interval',
+                minutes=DELTA_SYNC_INTERVAL_MINUTES,
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        except Exception as e:
+            logger.error(f"Error scheduling delta sync: {e}")
+    
+    def request_delta_sync(self):
+        """Run the delta sync job on the scheduler's next wakeup instead of waiting for its interval"""
+        if not self.use_real_api:
+            return False
+        try:
+            scheduler.modify_job(DELTA_SYNC_JOB_ID, next_run_time=datetime.now(pytz.UTC))
+            return True
+        except Exception as e:
+            logger.error(f"Error requesting delta sync: {e}")
+            return False
+    
+    def sync_updated_products(self, checkpoint_name="delta_sync"):
+        """Incrementally sync only the items updated since the last successful sync
+        
+        The first run has no watermark and walks the whole catalog; later runs
+        ask get_item_list for the update_time window since the stored watermark.
+        Delisted items only deactivate products that are already stored.
+        Runs every DELTA_SYNC_INTERVAL_MINUTES as a scheduler job, and right
+        away after a product refresh.
+        """
+        stats = {'items': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
         try:
-            item_id = api_data.get("item_id")
-            item_name = api_data.get("item_name", "Produto Shopee")
-            description = api_data.get("description", "")
-            
-            # Get price information
-            price_info = api_data.get("price_info", {})
-            current_price = float(price_info.get("current_price", 0)) / 100000  # Shopee uses 5 decimal places
-            original_price = float(price_info.get("original_price", current_price)) / 100000
-            
-            # Calculate discount
-            discount = 0
-            if original_price > current_price:
-                discount = int(((original_price - current_price) / original_price) * 100)
-            
-            # Get category
-            category_id = api_data.get("category_id")
-            category = self.map_shopee_category_to_local(category_id)
-            
-            # Get images (use first image)
-            image_info = api_data.get("image", {})
-            image_list = image_info.get("image_id_list", [])
-            image_url = ""
-            if image_list:
-                # Construct Shopee image URL
-                image_url = f"https://cf.shopee.com.br/file/{image_list[0]}"
-            
-            # Get statistics
-            item_status = api_data.get("item_status", "NORMAL")
-            if item_status != "NORMAL":
-                return None  # Skip inactive products
-            
-            # Check if product already exists
-            existing = Product.query.filter_by(shopee_id=str(item_id)).first()
-            if existing:
-                logger.debug(f"Product {item_id} already exists, skipping")
-                return None
-            
-            # Create new product
-            product_data = {
-                'shopee_id': str(item_id),
-                'title': item_name[:255],  # Respect field length limits
-                'description': description[:1000] if description else "",
-                'price': round(current_price, 2),
-                'original_price': round(original_price, 2),
-                'discount': discount,
-                'category': category,
-                'rating': round(random.uniform(4.0, 5.0), 1),  # API might not provide rating
-                'sold_count': random.randint(100, 1000),  # API might not provide sales count
-                'image_url': image_url,
-                'product_url': f"https://shopee.com.br/product/{item_id}",
-                'affiliate_link': self.generate_affiliate_link(str(item_id))
-            }
-            
-            product = Product(**product_data)
-            db.session.add(product)
-            
-            return product
+            checkpoint = self.get_checkpoint(checkpoint_name)
+            sync_until = int(time.time())
+            
+            # Include delisted items so their products can be deactivated
+            filters = {"item_status": ["NORMAL", "UNLIST", "BANNED"]}
+            if checkpoint.watermark:
+                filters.update({
+                    "update_time_from": checkpoint.watermark,
+                    "update_time_to": sync_until
+                })
+            
+            # Every window is new, so list pages are never served from the cache
+            for items, _ in self.iter_item_list_pages(use_cache=False, **filters):
+                details = self.get_product_details(self.item_ids_of(items), self.update_times_of(items))
+                
+                page_stats = self.store_api_items(details, SYNCED_PRODUCT_FIELDS)
+                for key in ('inserted', 'updated', 'unchanged'):
+                    stats[key] += page_stats[key]
+                
+                db.session.commit()
+                stats['items'] += len(items)
+            
+            # Only advance the watermark once the whole window has been stored
+            checkpoint.watermark = sync_until
+            checkpoint.updated_at = datetime.utcnow()
+            db.session.commit()
+            
+            logger.info(f"Delta sync finished: {stats['items']} changed items, {stats['inserted']} new, {stats['updated']} updated")
+            return stats
             
         except Exception as e:
-            logger.error(f"Error creating product from API data: {e}")
-            return None
+            logger.error(f"Error running delta sync: {e}")
+            db.session.rollback()
+            return stats
     
     def map_shopee_category_to_local(self, category_id):
         """Map Shopee category ID to local categories"""
@@ -246,7 +450,8 @@ class ShopeeService:
     def fetch_simulated_products(self, limit=20):
         """Fetch simulated products with realistic data"""
         try:
-            products = []
+            rows = []
+            affiliate_id = self.get_affiliate_id() or ''
             
             # Generate realistic product data
             product_templates = [
@@ -306,11 +511,6 @@ class ShopeeService:
                 # Generate unique variations
                 shopee_id = f"SP{random.randint(1000000, 9999999)}"
                 
-                # Check if product already exists
-                existing = Product.query.filter_by(shopee_id=shopee_id).first()
-                if existing:
-                    continue
-                
                 # Calculate discount and prices
                 discount = random.randint(5, 50)
                 original_price = template['base_price'] + random.uniform(-20, 50)
@@ -330,15 +530,15 @@ class ShopeeService:
                     'sold_count': random.randint(100, 5000),
                     'image_url': self.get_product_specific_image(title, template['category'], i+1),
                     'product_url': f"https://shopee.com.br/product/{shopee_id}",
-                    'affiliate_link': self.generate_affiliate_link(shopee_id)
+                    'affiliate_link': self.generate_affiliate_link(shopee_id, affiliate_id)
                 }
-                
-                # Create and save product
-                product = Product(**product_data)
-                db.session.add(product)
-                products.append(product)
+                rows.append(product_data)
             
+            # Ids that already exist are skipped by the upsert
+            stats = self.ingest_service.bulk_upsert(rows)
             db.session.commit()
+            
+            products = self.get_products_by_shopee_ids(stats['inserted_ids'])
             logger.info(f"Successfully fetched {len(products)} trending products")
             return products
             
@@ -347,18 +547,31 @@ class ShopeeService:
             db.session.rollback()
             return []
     
-    def generate_affiliate_link(self, shopee_id):
-        """Generate affiliate link for a product"""
+    def get_affiliate_id(self):
+        """Affiliate ID from the environment, or the one currently configured
+        
+        Read from the database on every call, never cached across requests, so
+        no process keeps linking new products to an ID replaced in the settings.
+        Resolve it once per batch and pass it to generate_affiliate_link.
+        """
+        affiliate_id = os.environ.get("SHOPEE_AFFILIATE_ID")
+        if affiliate_id:
+            return affiliate_id
+        
+        affiliate_config = AffiliateConfig.query.first()
+        return affiliate_config.affiliate_id if affiliate_config and affiliate_config.affiliate_id else None
+    
+    def generate_affiliate_link(self, shopee_id, affiliate_id=None):
+        """Generate affiliate link for a product
+        
+        Callers building many links should resolve affiliate_id once with
+        get_affiliate_id() and pass it in.
+        """
         try:
-            # Get affiliate ID from environment variables
-            affiliate_id = os.environ.get("SHOPEE_AFFILIATE_ID")
+            if affiliate_id is None:
+                affiliate_id = self.get_affiliate_id()
             if not affiliate_id:
-                # Fallback to database config
-                affiliate_config = AffiliateConfig.query.first()
-                if affiliate_config and affiliate_config.affiliate_id:
-                    affiliate_id = affiliate_config.affiliate_id
-                else:
-                    return f"https://shopee.com.br/product/{shopee_id}"
+                return f"https://shopee.com.br/product/{shopee_id}"
             
             # Generate affiliate link with tracking parameters
             affiliate_link = f"https://shopee.com.br/product/{shopee_id}?af={affiliate_id}&pid=partner&c=affiliate"
@@ -369,18 +582,36 @@ class ShopeeService:
             logger.error(f"Error generating affiliate link: {e}")
             return f"https://shopee.com.br/product/{shopee_id}"
     
-    def update_product_affiliate_links(self):
-        """Update all product affiliate links"""
+    def update_product_affiliate_links(self, chunk_size=CATALOG_CHUNK_SIZE):
+        """Update all product affiliate links
+        
+        Products are streamed in chunks and only rows whose link changes are
+        written, with one executemany UPDATE per chunk.
+        """
         try:
-            products = Product.query.filter_by(is_active=True).all()
+            affiliate_id = self.get_affiliate_id() or ''
             updated_count = 0
             
-            for product in products:
-                new_link = self.generate_affiliate_link(product.shopee_id)
-                if new_link != product.affiliate_link:
-                    product.affiliate_link = new_link
-                    product.updated_at = datetime.utcnow()
-                    updated_count += 1
+            stmt = update(Product.__table__).where(Product.id == bindparam('_id')).values(
+                affiliate_link=bindparam('new_affiliate_link'), updated_at=bindparam('now')
+            )
+            results = db.session.execute(
+                db.select(Product.id, Product.shopee_id, Product.affiliate_link)
+                .where(Product.is_active == True)
+                .execution_options(yield_per=chunk_size)
+            )
+            
+            for rows in results.partitions():
+                now = datetime.utcnow()
+                changes = []
+                for product_id, shopee_id, affiliate_link in rows:
+                    new_link = self.generate_affiliate_link(shopee_id, affiliate_id)
+                    if new_link != affiliate_link:
+                        changes.append({'_id': product_id, 'new_affiliate_link': new_link, 'now': now})
+                
+                if changes:
+                    db.session.execute(stmt, changes)
+                    updated_count += len(changes)
             
             if updated_count > 0:
                 db.session.commit()
@@ -395,88 +626,53 @@ class ShopeeService:
     
     def get_product_image_url(self, category, product_num):
         """Generate product-specific image URLs that match the product type"""
-        # Map products to specific matching images based on title keywords
-        product_specific_images = {
-            'smartwatch': 'https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=300&h=300&fit=crop&crop=center',
-            'fone': 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=300&h=300&fit=crop&crop=center',
-            'tenis': 'https://images.unsplash.com/photo-1542291026-7eec264c27ff?w=300&h=300&fit=crop&crop=center',
-            'vestido': 'https://images.unsplash.com/photo-1595777457583-95e059d581b8?w=300&h=300&fit=crop&crop=center',
-            'blusa': 'https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=300&h=300&fit=crop&crop=center',
-            'panela': 'https://images.unsplash.com/photo-1556909114-f6e7ad7d3136?w=300&h=300&fit=crop&crop=center',
-            'skincare': 'https://images.unsplash.com/photo-1556228720-195a672e8a03?w=300&h=300&fit=crop&crop=center',
-            'suporte': 'https://images.unsplash.com/photo-1527864550417-7fd91fc51a46?w=300&h=300&fit=crop&crop=center'
-        }
-        
-        # Category-specific fallback images
-        category_images = {
-            'Eletrônicos': [
-                'https://images.unsplash.com/photo-1498049794561-7780e7231661?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1560472354-b33ff0c44a43?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=300&h=300&fit=crop&crop=center'
-            ],
-            'Moda Feminina': [
-                'https://images.unsplash.com/photo-1595777457583-95e059d581b8?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1581338834647-b0fb40704e21?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1515372039744-b8f02a3ae446?w=300&h=300&fit=crop&crop=center'
-            ],
-            'Moda Masculina': [
-                'https://images.unsplash.com/photo-1542291026-7eec264c27ff?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1603252109612-ffd69d493909?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1594938298603-c8148c4dae35?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1618886614638-80e3c103d31a?w=300&h=300&fit=crop&crop=center'
-            ],
-            'Casa e Jardim': [
-                'https://images.unsplash.com/photo-1556909114-f6e7ad7d3136?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1586023492125-27b2c045efd7?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1555041469-a586c61ea9bc?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1527864550417-7fd91fc51a46?w=300&h=300&fit=crop&crop=center'
-            ],
-            'Beleza e Cuidados': [
-                'https://images.unsplash.com/photo-1556228720-195a672e8a03?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1596462502278-27bfdc403348?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1522335789203-aabd1fc54bc9?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1571019613454-1cb2f99b2d8b?w=300&h=300&fit=crop&crop=center'
-            ],
-            'Esportes': [
-                'https://images.unsplash.com/photo-1542291026-7eec264c27ff?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1571019613454-1cb2f99b2d8b?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1594938298603-c8148c4dae35?w=300&h=300&fit=crop&crop=center',
-                'https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=300&h=300&fit=crop&crop=center'
-            ]
-        }
-        
-        # Get category specific images
-        images = category_images.get(category, category_images['Eletrônicos'])
-        selected_image = images[product_num % len(images)]
-        
-        return selected_image
+        return image_resolver.category_image(category, product_num)
     
     def get_product_specific_image(self, title, category, product_num):
         """Get product-specific image based on title keywords"""
-        title_lower = title.lower()
+        return image_resolver.resolve(title, category, product_num)
+    
+    def assign_missing_images(self, chunk_size=CATALOG_CHUNK_SIZE):
+        """Assign images to every active product without a usable one
         
-        # Map specific products to appropriate images
-        if 'smartwatch' in title_lower or 'relógio' in title_lower:
-            return 'https://images.unsplash.com/photo-1523275335684-37898b6baf30?w=300&h=300&fit=crop&crop=center'
-        elif 'fone' in title_lower or 'headphone' in title_lower:
-            return 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=300&h=300&fit=crop&crop=center'
-        elif 'tênis' in title_lower or 'sapato' in title_lower:
-            return 'https://images.unsplash.com/photo-1542291026-7eec264c27ff?w=300&h=300&fit=crop&crop=center'
-        elif 'vestido' in title_lower:
-            return 'https://images.unsplash.com/photo-1595777457583-95e059d581b8?w=300&h=300&fit=crop&crop=center'
-        elif 'blusa' in title_lower or 'camisa' in title_lower:
-            return 'https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=300&h=300&fit=crop&crop=center'
-        elif 'panela' in title_lower or 'cozinha' in title_lower:
-            return 'https://images.unsplash.com/photo-1556909114-f6e7ad7d3136?w=300&h=300&fit=crop&crop=center'
-        elif 'skincare' in title_lower or 'beleza' in title_lower:
-            return 'https://images.unsplash.com/photo-1556228720-195a672e8a03?w=300&h=300&fit=crop&crop=center'
-        elif 'suporte' in title_lower or 'notebook' in title_lower:
-            return 'https://images.unsplash.com/photo-1527864550417-7fd91fc51a46?w=300&h=300&fit=crop&crop=center'
-        else:
-            # Fall back to category-based images
-            return self.get_product_image_url(category, product_num)
+        Images depend only on the product's shopee_id, title and category, so
+        every worker assigns the same image. Products are read by id ranges
+        and written back with one executemany UPDATE per chunk.
+        """
+        try:
+            updated_count = 0
+            last_id = 0
+            stmt = update(Product.__table__).where(Product.id == bindparam('_id')).values(
+                image_url=bindparam('new_image_url'), updated_at=bindparam('now')
+            )
+            
+            while True:
+                rows = db.session.query(Product.id, Product.shopee_id, Product.title, Product.category).filter(
+                    Product.id > last_id,
+                    Product.is_active == True,
+                    or_(Product.image_url.is_(None), Product.image_url == '', Product.image_url.contains('placeholder'))
+                ).order_by(Product.id).limit(chunk_size).all()
+                
+                if not rows:
+                    break
+                
+                now = datetime.utcnow()
+                db.session.execute(stmt, [
+                    {'_id': row.id, 'new_image_url': image_resolver.resolve_for_product(row.shopee_id, row.title, row.category), 'now': now}
+                    for row in rows
+                ])
+                updated_count += len(rows)
+                last_id = rows[-1].id
+            
+            db.session.commit()
+            if updated_count:
+                logger.info(f"Assigned images to {updated_count} products")
+            return updated_count
+            
+        except Exception as e:
+            logger.error(f"Error assigning product images: {e}")
+            db.session.rollback()
+            return 0
     
     def get_products_by_category(self, category, limit=10):
         """Get products by category"""
@@ -510,3 +706,10 @@ class ShopeeService:
         except Exception as e:
             logger.error(f"Error getting trending products for posting: {e}")
             return []
+
+def run_delta_sync():
+    """Scheduler entry point; jobs must reference a module-level function"""
+    with app.app_context():
+        shopee_service = ShopeeService()
+        if shopee_service.use_real_api:
+            shopee_service.sync_updated_products()
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import os
+import threading
+import tweepy
+from instagrapi import Client as InstagramClient
+from instagrapi.exceptions import LoginRequired
+from app import app
+
+logger = logging.getLogger(__name__)
+
+TWITTER_CREDENTIALS = ("TWITTER_API_KEY", "TWITTER_API_SECRET", "TWITTER_ACCESS_TOKEN", "TWITTER_ACCESS_TOKEN_SECRET")
+INSTAGRAM_CREDENTIALS = ("INSTAGRAM_USERNAME", "INSTAGRAM_PASSWORD")
+PLATFORM_CREDENTIALS = {'twitter': TWITTER_CREDENTIALS, 'instagram': INSTAGRAM_CREDENTIALS}
+
+# Errors meaning the platform no longer accepts a client's session or tokens
+AUTH_ERRORS = (tweepy.errors.Unauthorized, LoginRequired)
+
+# Saved instagrapi sessions, so restarts reuse the login instead of triggering challenges
+INSTAGRAM_SESSION_DIR = os.environ.get("INSTAGRAM_SESSION_DIR", os.path.join(app.instance_path, "instagram_sessions"))
+
+class SocialClientRegistry:
+    """Authenticated social platform clients, built once per account and reused
+    
+    Clients are keyed by platform and account and rebuilt only when the
+    account's credentials change or the platform rejects them.
+    """
+    
+    def __init__(self, session_dir=INSTAGRAM_SESSION_DIR):
+        self.session_dir = session_dir
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.build_locks = {}
+    
+    def fingerprint(self, credentials):
+        return hashlib.sha256("\0".join(credentials).encode("utf-8")).hexdigest()
+    
+    def key(self, platform, account):
+        return (platform, account.id if account is not None else None)
+    
+    def get(self, platform, account, credentials, build):
+        """Return the cached client for an account, building it when missing or stale"""
+        key = self.key(platform, account)
+        fingerprint = self.fingerprint(credentials)
+        
+        with self.lock:
+            cached = self.clients.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+            build_lock = self.build_locks.setdefault(key, threading.Lock())
+        
+        # Logins are slow, so only callers of the same account wait for each other
+        with build_lock:
+            with self.lock:
+                cached = self.clients.get(key)
+                if cached and cached[0] == fingerprint:
+                    return cached[1]
+            
+            client = build(*credentials)
+            with self.lock:
+                self.clients[key] = (fingerprint, client, credentials)
+            return client
+    
+    def invalidate(self, platform, account):
+        """Drop a client the platform no longer accepts"""
+        with self.lock:
+            cached = self.clients.pop(self.key(platform, account), None)
+        
+        # A rejected Instagram session must not be loaded again
+        if platform == 'instagram' and cached:
+            path = self.instagram_session_path(cached[2][0])
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info(f"Discarded {platform} client, it will log in again on the next post")
+    
+    def has_credentials(self, platform):
+        return self.credentials(PLATFORM_CREDENTIALS[platform]) is not None
+    
+    def run(self, platform, account, action):
+        """Call action(client), logging in again once if the platform rejects the client"""
+        getters = {'twitter': self.get_twitter_client, 'instagram': self.get_instagram_client}
+        try:
+            return action(getters[platform](account))
+        except AUTH_ERRORS as e:
+            logger.warning(f"{platform} rejected the cached client ({e}), logging in again")
+            self.invalidate(platform, account)
+            return action(getters[platform](account))
+    
+    def credentials(self, names):
+        """Credential values from the environment, or None when any is missing"""
+        values = tuple(os.environ.get(name) for name in names)
+        return values if all(values) else None
+    
+    def get_twitter_client(self, account):
+        """Cached tweepy client for an account, or None without credentials"""
+        credentials = self.credentials(TWITTER_CREDENTIALS)
+        if not credentials:
+            return None
+        return self.get('twitter', account, credentials, self.build_twitter_client)
+    
+    def build_twitter_client(self, api_key, api_secret, access_token, access_token_secret):
+        logger.info("Creating Twitter client")
+        return tweepy.Client(
+            consumer_key=api_key,
+            consumer_secret=api_secret,
+            access_token=access_token,
+            access_token_secret=access_token_secret
+        )
+    
+    def get_instagram_client(self, account):
+        """Cached, logged-in instagrapi client for an account, or None without credentials"""
+        credentials = self.credentials(INSTAGRAM_CREDENTIALS)
+        if not credentials:
+            return None
+        return self.get('instagram', account, credentials, self.build_instagram_client)
+    
+    def instagram_session_path(self, username):
+        return os.path.join(self.session_dir, f"{username}.json")
+    
+    def build_instagram_client(self, username, password):
+        client = InstagramClient()
+        path = self.instagram_session_path(username)
+        
+        # Logging in with saved settings reuses the device and session cookies
+        if os.path.exists(path):
+            client.load_settings(path)
+        
+        logger.info(f"Logging in to Instagram as @{username}")
+        client.login(username, password)
+        
+        os.makedirs(self.session_dir, exist_ok=True)
+        client.dump_settings(path)
+        return client
+
+# Shared by every service in the process
+social_client_registry = SocialClientRegistry()
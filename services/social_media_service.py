@@ -1,19 +1,29 @@
 import logging
 import random
-import os
 from datetime import datetime, timedelta
 from app import db
 from models import Post, SocialMediaAccount, Product
 import json
-import tweepy
-from instagrapi import Client as InstagramClient
+import requests
+import tempfile
+from pathlib import Path
+from services.social_client_registry import social_client_registry
+from services.quota_service import quota_service
 
 logger = logging.getLogger(__name__)
 
+# Failed posts are retried with exponential backoff, then given up on as dead
+MAX_POST_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
 class SocialMediaService:
     """Service for handling social media operations"""
     
     def __init__(self):
+        # Pooled connections for downloading product images
+        self.http_session = requests.Session()
+        
         self.platforms = {
             'instagram': {
                 'max_chars': 2200,
@@ -33,7 +43,11 @@ class SocialMediaService:
         }
     
     def create_post(self, product, platform, scheduled_time=None):
-        """Create a social media post for a product"""
+        """Create a social media post for a product
+        
+        Posts without a scheduled_time are queued as pending and published
+        by the post dispatcher, so callers never wait on a platform API.
+        """
         try:
             # Check if platform is configured
             account = SocialMediaAccount.query.filter_by(
@@ -54,26 +68,19 @@ class SocialMediaService:
                 platform=platform,
                 content=content,
                 scheduled_time=scheduled_time or datetime.utcnow(),
-                status='scheduled' if scheduled_time else 'posted'
+                status='scheduled' if scheduled_time else 'pending'
             )
             
-            # If posting immediately, post to the platform
-            if not scheduled_time:
-                success = self.post_to_platform(post, account)
-                if success:
-                    post.status = 'posted'
-                    post.posted_time = datetime.utcnow()
-                    post.post_id = f"{platform}_{random.randint(1000000, 9999999)}"
-                    
-                    # Generate simulated engagement data
-                    post.engagement_data = json.dumps(self.generate_simulated_engagement(platform))
-                else:
-                    post.status = 'failed'
-                    post.error_message = "Simulated posting failure"
-            
             db.session.add(post)
+            quota_service.increment(post)
             db.session.commit()
             
+            # If posting immediately, hand the post to the dispatcher
+            if not scheduled_time:
+                # Imported here because the dispatcher publishes through this service
+                from services.post_dispatcher import post_dispatcher
+                post_dispatcher.wake_up()
+            
             logger.info(f"Created {platform} post for product: {product.title}")
             return True
             
@@ -82,6 +89,76 @@ class SocialMediaService:
             db.session.rollback()
             return False
     
+    def create_claimed_posts(self, product, platforms, token):
+        """Create one post per platform, already claimed with token for publishing
+        
+        Content for every platform is generated up front and all posts are
+        stored in one commit; the caller publishes them through the dispatcher.
+        """
+        now = datetime.utcnow()
+        posts = [
+            Post(
+                product_id=product.id,
+                platform=platform,
+                content=self.generate_post_content(product, platform),
+                scheduled_time=now,
+                status='publishing',
+                claimed_by=token,
+                claimed_at=now
+            )
+            for platform in platforms
+        ]
+        
+        try:
+            db.session.add_all(posts)
+            for post in posts:
+                quota_service.increment(post)
+            db.session.commit()
+            return posts
+        
+        except Exception as e:
+            logger.error(f"Error creating posts for product {product.id}: {e}")
+            db.session.rollback()
+            return []
+    
+    def publish_post(self, post, account):
+        """Publish a stored post and record the outcome on it, without committing"""
+        success = self.post_to_platform(post, account)
+        if success:
+            post.status = 'posted'
+            post.posted_time = datetime.utcnow()
+            post.post_id = f"{post.platform}_{random.randint(1000000, 9999999)}"
+            post.error_message = None
+            
+            # Generate simulated engagement data
+            post.engagement_data = json.dumps(self.generate_simulated_engagement(post.platform))
+            
+            # Imported here because the poller refreshes engagement through this service
+            from services.engagement_poller import engagement_poller
+            engagement_poller.schedule_next(post)
+        else:
+            self.record_failure(post, f"Failed to post to {post.platform}")
+        
+        return success
+    
+    def record_failure(self, post, error_message):
+        """Mark a post failed and schedule its next retry, or mark it dead when out of attempts"""
+        post.attempts = (post.attempts or 0) + 1
+        post.error_message = error_message
+        
+        if post.attempts >= MAX_POST_ATTEMPTS:
+            post.status = 'dead'
+            post.next_attempt_at = None
+            logger.warning(f"Giving up on post {post.id} after {post.attempts} attempts: {error_message}")
+        else:
+            post.status = 'failed'
+            post.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(post.attempts))
+    
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter, so posts failed together are not retried together"""
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        return delay / 2 + random.uniform(0, delay / 2)
+    
     def generate_post_content(self, product, platform):
         """Generate optimized content for each platform"""
         try:
@@ -209,55 +286,54 @@ Aproveite essa oportunidade única! 👇
     def post_to_instagram(self, post, account):
         """Post to Instagram using instagrapi"""
         try:
-            username = os.environ.get("INSTAGRAM_USERNAME")
-            password = os.environ.get("INSTAGRAM_PASSWORD")
-            
-            if not username or not password:
+            if not social_client_registry.has_credentials('instagram'):
                 logger.error("Instagram credentials not found")
                 return self.simulate_post_to_platform(post, account)
             
-            # For now, use simulation until we implement image downloading
-            # TODO: Download product image and upload to Instagram
-            logger.info(f"Instagram posting enabled for @{username}")
-            return self.simulate_post_to_platform(post, account)
+            product = db.session.get(Product, post.product_id)
+            if not product or not product.image_url:
+                logger.warning(f"Product {post.product_id} has no image to post on Instagram")
+                return False
+            
+            # Download product image and upload it with the account's logged-in client
+            image_response = self.http_session.get(product.image_url, timeout=15)
+            image_response.raise_for_status()
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                image_path = Path(tmp_dir) / "product.jpg"
+                image_path.write_bytes(image_response.content)
+                media = social_client_registry.run(
+                    'instagram', account, lambda client: client.photo_upload(image_path, post.content)
+                )
+            
+            logger.info(f"Successfully posted to Instagram: {media.pk}")
+            return True
                 
         except Exception as e:
             logger.error(f"Error posting to Instagram: {e}")
-            return self.simulate_post_to_platform(post, account)
+            return False
     
     def post_to_twitter(self, post, account):
         """Post to Twitter using tweepy"""
         try:
-            api_key = os.environ.get("TWITTER_API_KEY")
-            api_secret = os.environ.get("TWITTER_API_SECRET")
-            access_token = os.environ.get("TWITTER_ACCESS_TOKEN")
-            access_token_secret = os.environ.get("TWITTER_ACCESS_TOKEN_SECRET")
-            
-            if not all([api_key, api_secret, access_token, access_token_secret]):
+            if not social_client_registry.has_credentials('twitter'):
                 logger.error("Twitter credentials not found")
                 return self.simulate_post_to_platform(post, account)
             
-            # Create Twitter API client
-            client = tweepy.Client(
-                consumer_key=api_key,
-                consumer_secret=api_secret,
-                access_token=access_token,
-                access_token_secret=access_token_secret
+            # Post tweet with the account's cached client
+            response = social_client_registry.run(
+                'twitter', account, lambda client: client.create_tweet(text=post.content)
             )
             
-            # Post tweet
-            response = client.create_tweet(text=post.content)
-            
             if response.data:
                 logger.info(f"Successfully posted to Twitter: {response.data['id']}")
                 return True
             else:
                 logger.error("Failed to post to Twitter")
-                return self.simulate_post_to_platform(post, account)
+                return False
                 
         except Exception as e:
             logger.error(f"Error posting to Twitter: {e}")
-            return self.simulate_post_to_platform(post, account)
+            return False
     
     def simulate_post_to_platform(self, post, account):
         """Simulate posting to social media platform"""
@@ -307,29 +383,17 @@ Aproveite essa oportunidade única! 👇
                 'comments': random.randint(0, 5)
             }
     
-    def update_post_engagement(self, post_id):
-        """Update engagement data for a post"""
-        try:
-            post = Post.query.get(post_id)
-            if not post or post.status != 'posted':
-                return False
-            
-            # Simulate updated engagement data
-            current_engagement = post.get_engagement_data()
-            
-            # Slightly increase engagement numbers
-            for key, value in current_engagement.items():
-                if random.random() < 0.3:  # 30% chance to increase
-                    current_engagement[key] = value + random.randint(1, 5)
-            
-            post.engagement_data = json.dumps(current_engagement)
-            db.session.commit()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error updating post engagement: {e}")
-            return False
+    def fetch_engagement(self, post):
+        """Current engagement numbers of a published post"""
+        # Simulate updated engagement data
+        current_engagement = post.get_engagement_data()
+        
+        # Slightly increase engagement numbers
+        for key, value in current_engagement.items():
+            if random.random() < 0.3:  # 30% chance to increase
+                current_engagement[key] = value + random.randint(1, 5)
+        
+        return current_engagement
     
     def get_platform_posts(self, platform, limit=10):
         """Get recent posts for a specific platform"""
@@ -343,35 +407,3 @@ Aproveite essa oportunidade única! 👇
         except Exception as e:
             logger.error(f"Error getting posts for platform {platform}: {e}")
             return []
-    
-    def retry_failed_posts(self):
-        """Retry failed posts"""
-        try:
-            failed_posts = Post.query.filter_by(status='failed').all()
-            retried_count = 0
-            
-            for post in failed_posts:
-                account = SocialMediaAccount.query.filter_by(
-                    platform=post.platform, 
-                    is_active=True
-                ).first()
-                
-                if account:
-                    success = self.simulate_post_to_platform(post, account)
-                    if success:
-                        post.status = 'posted'
-                        post.posted_time = datetime.utcnow()
-                        post.post_id = f"{post.platform}_{random.randint(1000000, 9999999)}"
-                        post.engagement_data = json.dumps(self.generate_simulated_engagement(post.platform))
-                        post.error_message = None
-                        retried_count += 1
-            
-            if retried_count > 0:
-                db.session.commit()
-                logger.info(f"Successfully retried {retried_count} failed posts")
-            
-            return retried_count
-            
-        except Exception as e:
-            logger.error(f"Error retrying failed posts: {e}")
-            return 0
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Shopee partner API
+Serves get_item_list and get_item_base_info for a synthetic catalog so the
+real-API code paths can be exercised and benchmarked without a network.
+
+Usage:
+    python shopee_stub_server.py --items 1000000 --latency-ms 40 --error-rate 0.01
+
+Then point the app at it:
+    SHOPEE_API_BASE_URL=http://127.0.0.1:8765 SHOPEE_PARTNER_ID=1 SHOPEE_PARTNER_KEY=stub-key \\
+    SHOPEE_ACCESS_TOKEN=stub-token SHOPEE_SHOP_ID=1 python main.py
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+ITEM_LIST_PATH = "/api/v2/product/get_item_list"
+ITEM_BASE_INFO_PATH = "/api/v2/product/get_item_base_info"
+STATS_PATH = "/stub/stats"
+
+# Same limits as the partner API
+MAX_PAGE_SIZE = 100
+MAX_BASE_INFO_IDS = 50
+# Requests signed longer ago than this are rejected
+SIGNATURE_MAX_AGE = 300
+
+FIRST_ITEM_ID = 1000000
+# update_time of the catalog is spread over the 30 days before this
+CATALOG_EPOCH = 1735689600
+UPDATE_TIME_WINDOW = 30 * 24 * 3600
+
+# Category ids understood by ShopeeService.map_shopee_category_to_local
+CATEGORY_IDS = [11013247, 11013252, 11013253, 11013478, 11013384, 11000001, 11013019, 11013409, 11013813]
+PRODUCT_NAMES = [
+    'Fone de Ouvido Bluetooth', 'Smartwatch Fitness', 'Tênis Esportivo', 'Vestido Floral',
+    'Camisa Social', 'Panela Antiaderente', 'Kit Skincare', 'Suporte para Notebook',
+    'Caixa de Som Portátil', 'Mochila Executiva', 'Luminária LED', 'Garrafa Térmica'
+]
+# Cumulative share of each item status in the catalog
+ITEM_STATUS_SHARES = [('NORMAL', 0.95), ('UNLIST', 0.99), ('BANNED', 1.0)]
+
+# Filtered id lists kept for paginating get_item_list with filters
+FILTER_CACHE_SIZE = 32
+
+class SyntheticCatalog:
+    """Deterministic catalog: every item is generated from its id and the seed"""
+    
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self.filtered = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def item_id(self, index):
+        return FIRST_ITEM_ID + index
+    
+    def contains(self, item_id):
+        return FIRST_ITEM_ID <= item_id < FIRST_ITEM_ID + self.size
+    
+    def mix(self, item_id, salt):
+        return zlib.crc32(f"{self.seed}:{salt}:{item_id}".encode())
+    
+    def update_time(self, item_id):
+        return CATALOG_EPOCH - self.mix(item_id, 'update_time') % UPDATE_TIME_WINDOW
+    
+    def item_status(self, item_id):
+        share = self.mix(item_id, 'status') / 0xFFFFFFFF
+        for status, cumulative in ITEM_STATUS_SHARES:
+            if share <= cumulative:
+                return status
+        return 'NORMAL'
+    
+    def list_entry(self, item_id):
+        return {
+            "item_id": item_id,
+            "item_status": self.item_status(item_id),
+            "update_time": self.update_time(item_id)
+        }
+    
+    def base_info(self, item_id):
+        rng = random.Random(self.mix(item_id, 'base_info'))
+        original_price = rng.randint(1990, 49990) * 1000  # Shopee prices have 5 decimal places
+        current_price = original_price * (100 - rng.choice([0, 0, 5, 10, 15, 20, 30, 40])) // 100
+        name = rng.choice(PRODUCT_NAMES)
+        
+        return {
+            "item_id": item_id,
+            "category_id": rng.choice(CATEGORY_IDS),
+            "item_name": f"{name} {item_id}",
+            "description": f"{name} com entrega rápida para todo o Brasil.",
+            "item_status": self.item_status(item_id),
+            "update_time": self.update_time(item_id),
+            "price_info": {"currency": "BRL", "original_price": original_price, "current_price": current_price},
+            "image": {"image_id_list": [hashlib.md5(str(item_id).encode()).hexdigest()]}
+        }
+    
+    def matching_ids(self, statuses, update_time_from, update_time_to):
+        """Ids matching get_item_list filters, computed once per filter combination"""
+        key = (statuses, update_time_from, update_time_to)
+        with self.lock:
+            if key in self.filtered:
+                self.filtered.move_to_end(key)
+                return self.filtered[key]
+        
+        ids = [
+            item_id for item_id in range(FIRST_ITEM_ID, FIRST_ITEM_ID + self.size)
+            if (not statuses or self.item_status(item_id) in statuses)
+            and (update_time_from is None or self.update_time(item_id) >= update_time_from)
+            and (update_time_to is None or self.update_time(item_id) <= update_time_to)
+        ]
+        
+        with self.lock:
+            self.filtered[key] = ids
+            while len(self.filtered) > FILTER_CACHE_SIZE:
+                self.filtered.popitem(last=False)
+        return ids
+
+class RateLimiter:
+    """Token bucket deciding when the stub answers with 429"""
+    
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+class StubApiError(Exception):
+    def __init__(self, status, error, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+        self.headers = headers or {}
+
+class ShopeeStubServer(ThreadingHTTPServer):
+    """HTTP server holding the catalog, credentials and fault injection settings"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, catalog, partner_id, partner_key, access_token, shop_id,
+                 latency_ms=0, jitter_ms=0, error_rate=0.0, throttle_rate=0.0, rate_limit=0, verify_signature=True):
+        super().__init__(address, StubRequestHandler)
+        self.catalog = catalog
+        self.partner_id = str(partner_id)
+        self.partner_key = partner_key
+        self.access_token = access_token
+        self.shop_id = str(shop_id)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.verify_signature = verify_signature
+        self.counters = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0, 'auth_failures': 0}
+        self.counters_lock = threading.Lock()
+    
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def count(self, name):
+        with self.counters_lock:
+            self.counters[name] += 1
+    
+    def start_in_thread(self):
+        """Serve from a daemon thread, for embedding in benchmarks"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+    
+    def check_signature(self, path, query):
+        if not self.verify_signature:
+            return
+        
+        partner_id = query.get('partner_id', [''])[0]
+        access_token = query.get('access_token', [''])[0]
+        shop_id = query.get('shop_id', [''])[0]
+        sign = query.get('sign', [''])[0]
+        try:
+            timestamp = int(query.get('timestamp', [''])[0])
+        except ValueError:
+            raise StubApiError(403, "error_param", "Missing or invalid timestamp")
+        
+        if partner_id != self.partner_id or shop_id != self.shop_id or access_token != self.access_token:
+            raise StubApiError(403, "error_auth", "Invalid partner_id, shop_id or access_token")
+        if abs(time.time() - timestamp) > SIGNATURE_MAX_AGE:
+            raise StubApiError(403, "error_auth", "Request timestamp expired")
+        
+        base_string = f"{partner_id}{path}{timestamp}{access_token}{shop_id}"
+        expected = hmac.new(self.partner_key.encode('utf-8'), base_string.encode('utf-8'), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, sign):
+            raise StubApiError(403, "error_sign", "Wrong sign")
+    
+    def inject_faults(self):
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        
+        if not self.rate_limiter.allow() or (self.throttle_rate and random.random() < self.throttle_rate):
+            raise StubApiError(429, "error_too_many_request", "Too many requests", {"Retry-After": "1"})
+        if self.error_rate and random.random() < self.error_rate:
+            raise StubApiError(500, "error_server", "Injected server error")
+    
+    def item_list(self, query):
+        try:
+            offset = int(query.get('offset', ['0'])[0])
+            page_size = int(query.get('page_size', [str(MAX_PAGE_SIZE)])[0])
+            update_time_from = int(query['update_time_from'][0]) if 'update_time_from' in query else None
+            update_time_to = int(query['update_time_to'][0]) if 'update_time_to' in query else None
+        except ValueError:
+            raise StubApiError(400, "error_param", "Invalid offset, page_size or update_time")
+        if offset < 0 or not 0 < page_size <= MAX_PAGE_SIZE:
+            raise StubApiError(400, "error_param", f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+        
+        statuses = tuple(sorted(query.get('item_status', [])))
+        if statuses or update_time_from is not None or update_time_to is not None:
+            ids = self.catalog.matching_ids(statuses, update_time_from, update_time_to)
+            total = len(ids)
+            page = ids[offset:offset + page_size]
+        else:
+            total = self.catalog.size
+            page = [self.catalog.item_id(index) for index in range(offset, min(offset + page_size, total))]
+        
+        has_next_page = offset + page_size < total
+        return {
+            "item": [self.catalog.list_entry(item_id) for item_id in page],
+            "total_count": total,
+            "has_next_page": has_next_page,
+            "next_offset": offset + page_size if has_next_page else 0
+        }
+    
+    def item_base_info(self, query):
+        try:
+            item_ids = [int(item_id) for item_id in ','.join(query.get('item_id_list', [])).split(',') if item_id]
+        except ValueError:
+            raise StubApiError(400, "error_param", "Invalid item_id_list")
+        if not 0 < len(item_ids) <= MAX_BASE_INFO_IDS:
+            raise StubApiError(400, "error_param", f"item_id_list must have between 1 and {MAX_BASE_INFO_IDS} ids")
+        
+        return {"item_list": [self.catalog.base_info(item_id) for item_id in item_ids if self.catalog.contains(item_id)]}
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        
+        if parts.path == STATS_PATH:
+            with server.counters_lock:
+                return self.send_json(200, dict(server.counters))
+        
+        server.count('requests')
+        handlers = {ITEM_LIST_PATH: server.item_list, ITEM_BASE_INFO_PATH: server.item_base_info}
+        try:
+            if parts.path not in handlers:
+                raise StubApiError(404, "error_not_found", f"Unknown path {parts.path}")
+            server.check_signature(parts.path, query)
+            server.inject_faults()
+            response = handlers[parts.path](query)
+        except StubApiError as e:
+            server.count({429: 'throttled', 403: 'auth_failures'}.get(e.status, 'errors'))
+            return self.send_json(e.status, {"error": e.error, "message": e.message, "request_id": self.request_id()}, e.headers)
+        
+        server.count('ok')
+        self.send_json(200, {"error": "", "message": "", "request_id": self.request_id(), "response": response})
+    
+    def request_id(self):
+        return f"{random.getrandbits(64):016x}"
+    
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Request logging would dominate the cost of a load test
+        pass
+
+def create_server(host='127.0.0.1', port=8765, items=10000, seed=0, partner_id='1', partner_key='stub-key',
+                  access_token='stub-token', shop_id='1', **options):
+    """Create a stub server; port 0 picks a free port"""
+    return ShopeeStubServer(
+        (host, port), SyntheticCatalog(items, seed),
+        partner_id, partner_key, access_token, shop_id, **options
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Shopee partner API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--items', type=int, default=10000, help="catalog size")
+    parser.add_argument('--seed', type=int, default=0, help="catalog seed; the same seed gives the same catalog")
+    parser.add_argument('--partner-id', default='1')
+    parser.add_argument('--partner-key', default='stub-key')
+    parser.add_argument('--access-token', default='stub-token')
+    parser.add_argument('--shop-id', default='1')
+    parser.add_argument('--latency-ms', type=float, default=0, help="added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="random extra latency, up to this much")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument('--rate-limit', type=float, default=0, help="requests per second before answering 429 (0 = unlimited)")
+    parser.add_argument('--no-verify-signature', action='store_true')
+    args = parser.parse_args()
+    
+    server = create_server(
+        args.host, args.port, args.items, args.seed,
+        args.partner_id, args.partner_key, args.access_token, args.shop_id,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+        verify_signature=not args.no_verify_signature
+    )
+    
+    print(f"Shopee API stub serving {args.items} items on {server.url}")
+    print(f"Set SHOPEE_API_BASE_URL={server.url} SHOPEE_PARTNER_ID={args.partner_id} "
+          f"SHOPEE_PARTNER_KEY={args.partner_key} SHOPEE_ACCESS_TOKEN={args.access_token} SHOPEE_SHOP_ID={args.shop_id}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import logging
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time, so point it at a scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='shopee-tests-'), 'test.db')}"
+os.environ["SCHEDULER_MODE"] = "follower"
+
+from app import app, db
+
+# The paused scheduler thread keeps logging after pytest has closed its output
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+@pytest.fixture
+def app_context():
+    """App context over empty tables"""
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        yield app
+        db.session.rollback()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from app import app, db
+from config import Config
+from models import Post, Product, ScheduleConfig, SocialMediaAccount
+from services.campaign_service import CampaignError, CampaignService
+from services.post_dispatcher import post_dispatcher
+from services.scheduler_service import scheduler_service
+
+@pytest.fixture
+def catalog(app_context, monkeypatch):
+    """Ten postable products, a Twitter account and a limit of 4 posts a day"""
+    monkeypatch.setattr(post_dispatcher, 'wake_up', lambda: None)
+    db.session.add(SocialMediaAccount(platform='twitter', username='loja', is_active=True))
+    db.session.add(ScheduleConfig(platform='twitter', max_posts_per_day=4, posting_times=['09:00'], is_active=True))
+    products = [
+        Product(shopee_id=f'campaign-{n}', title=f'Produto {n}', price=10.0, discount=10, rating=4.5,
+                sold_count=500, affiliate_link='https://shopee.com.br', is_active=True)
+        for n in range(10)
+    ]
+    db.session.add_all(products)
+    db.session.commit()
+    return [product.id for product in products]
+
+def later_today():
+    """A posting time a few minutes ahead in the schedule timezone, or None close to midnight"""
+    soon = datetime.now(pytz.timezone(Config.SCHEDULER_TIMEZONE)) + timedelta(minutes=5)
+    if soon.date() != (soon - timedelta(minutes=5)).date():
+        return None
+    return soon.date(), soon.strftime('%H:%M')
+
+def test_campaign_and_slot_posts_share_the_daily_limit(catalog):
+    today = later_today()
+    if today is None:
+        pytest.skip("too close to midnight to plan a campaign for today")
+    day, posting_time = today
+    campaign_service = CampaignService()
+    
+    campaign_service.plan(catalog[:3], ['twitter'], start_date=day, days=1, posting_times=[posting_time])
+    scheduler_service.create_scheduled_post('twitter')
+    
+    assert Post.query.filter_by(platform='twitter').count() == 4
+    assert scheduler_service.has_reached_daily_limit('twitter')
+    with pytest.raises(CampaignError, match="daily post limit"):
+        campaign_service.plan(catalog[3:4], ['twitter'], start_date=day, days=1, posting_times=[posting_time])
+    assert Post.query.count() == 4
+
+def test_campaign_over_the_daily_limit_is_rejected_as_a_whole(catalog):
+    tomorrow = datetime.now(pytz.timezone(Config.SCHEDULER_TIMEZONE)).date() + timedelta(days=1)
+    
+    with pytest.raises(CampaignError, match=f"twitter on {tomorrow.isoformat()} \\(5 planned, 0 already scheduled\\)"):
+        CampaignService().plan(catalog[:5], ['twitter'], start_date=tomorrow, days=1, posting_times=['09:00'])
+    assert Post.query.count() == 0
+
+@pytest.mark.parametrize('payload', [
+    {'product_ids': 5},
+    {'product_ids': ['abc']},
+    {'product_ids': [1], 'platforms': 'twitter'},
+    {'product_ids': [1], 'platforms': ['facebook']},
+    {'product_ids': [1], 'days': 'x'},
+    {'product_ids': [1], 'start_date': '17/10/2026'},
+    {'product_ids': [1], 'posting_times': '09:00'},
+])
+def test_invalid_campaign_requests_are_rejected(catalog, payload):
+    response = app.test_client().post('/api/campaigns', json=payload)
+    
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert 'invalid literal' not in response.get_json()['message']
+
+def test_campaign_times_are_returned_in_utc(catalog):
+    tomorrow = datetime.now(pytz.timezone(Config.SCHEDULER_TIMEZONE)).date() + timedelta(days=1)
+    
+    response = app.test_client().post('/api/campaigns', json={
+        'product_ids': catalog[:4], 'platforms': ['twitter'], 'start_date': tomorrow.isoformat(),
+        'days': 1, 'posting_times': ['09:00']
+    })
+    
+    assert response.status_code == 200
+    assert response.get_json()['first_post_at'].endswith('Z')
@@ -0,0 +1,17 @@
+from sqlalchemy import update
+
+from app import db
+from models import Product
+from services.facet_service import FacetService
+
+def test_core_product_update_invalidates_cached_counts(app_context):
+    db.session.add(Product(shopee_id='facet', title='Fone', price=10.0, category='Eletrônicos', is_active=True))
+    db.session.commit()
+    facet_service = FacetService()
+    facet_service.rebuild_counts()
+    assert facet_service.get_category_counts() == [('Eletrônicos', 1)]
+    
+    db.session.execute(update(Product.__table__).values(category='Pets'))
+    db.session.commit()
+    
+    assert facet_service.get_category_counts() == [('Pets', 1)]
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import Post, Product
+from services.post_dispatcher import CLAIM_TIMEOUT_MINUTES, post_dispatcher
+from services.social_media_service import MAX_POST_ATTEMPTS
+
+def add_stale_post(attempts):
+    product = Product(shopee_id=f'stale-{attempts}', title='Fone', price=10.0)
+    db.session.add(product)
+    db.session.flush()
+    post = Post(
+        product_id=product.id, platform='twitter', content='Fone', status='publishing',
+        claimed_by='crashed', claimed_at=datetime.utcnow() - timedelta(minutes=CLAIM_TIMEOUT_MINUTES + 1),
+        attempts=attempts
+    )
+    db.session.add(post)
+    db.session.commit()
+    return post.id
+
+def test_stale_claim_counts_as_a_failed_attempt(app_context):
+    post_id = add_stale_post(attempts=0)
+    
+    post_dispatcher.release_stale_claims()
+    
+    post = db.session.get(Post, post_id)
+    assert (post.status, post.attempts, post.claimed_by) == ('failed', 1, None)
+    assert post.next_attempt_at > datetime.utcnow()
+
+def test_post_that_keeps_crashing_its_publisher_is_given_up_on(app_context):
+    post_id = add_stale_post(attempts=MAX_POST_ATTEMPTS - 1)
+    
+    post_dispatcher.release_stale_claims()
+    
+    assert db.session.get(Post, post_id).status == 'dead'
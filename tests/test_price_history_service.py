@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import PriceHistory, Product
+from services.price_history_service import PriceHistoryService
+
+def add_product(shopee_id, prices, hours_ago):
+    """Store a product with one history row per price change, oldest first"""
+    product = Product(shopee_id=shopee_id, title=shopee_id, price=prices[-1], is_active=True)
+    db.session.add(product)
+    db.session.flush()
+    for previous_price, price, age in zip(prices, prices[1:], hours_ago):
+        db.session.add(PriceHistory(
+            product_id=product.id, price=price, previous_price=previous_price,
+            recorded_at=datetime.utcnow() - timedelta(hours=age)
+        ))
+    db.session.commit()
+    return product
+
+def test_two_step_drop_is_measured_from_the_window_start(app_context):
+    product = add_product('two-step', [100.0, 90.0, 81.0], hours_ago=[10, 5])
+    
+    drops = PriceHistoryService().get_price_drops(min_drop_percent=15, hours=24)
+    
+    assert [(p.id, start_price, drop) for p, start_price, drop in drops] == [(product.id, 100.0, 19.0)]
+
+def test_reverted_drop_is_not_reported(app_context):
+    add_product('rebound', [100.0, 70.0, 100.0], hours_ago=[10, 5])
+    
+    assert PriceHistoryService().get_price_drops(min_drop_percent=15, hours=24) == []
+
+def test_changes_before_the_window_are_ignored(app_context):
+    product = add_product('old-drop', [200.0, 100.0, 80.0], hours_ago=[48, 5])
+    
+    drops = PriceHistoryService().get_price_drops(min_drop_percent=15, hours=24)
+    
+    assert [(p.id, start_price, drop) for p, start_price, drop in drops] == [(product.id, 100.0, 20.0)]
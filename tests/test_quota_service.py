@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from app import db
+from models import Post, PostQuota, Product
+from services.quota_service import quota_service
+
+def test_used_does_not_write_or_commit(app_context):
+    product = Product(shopee_id='quota', title='Fone', price=10.0)
+    db.session.add(product)
+    db.session.commit()
+    db.session.add(Post(product_id=product.id, platform='twitter', content='Fone', status='pending', scheduled_time=datetime.utcnow()))
+    db.session.flush()
+    
+    assert quota_service.used('twitter') == 1
+    
+    # The caller's pending post is still only in its transaction
+    db.session.rollback()
+    assert Post.query.count() == 0
+    assert PostQuota.query.count() == 0
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import Post, Product, ProductRotation
+from services.rotation_service import ROTATION_COOLDOWN, rotation_service
+
+def add_product(shopee_id):
+    product = Product(shopee_id=shopee_id, title=shopee_id, price=10.0, rating=4.5, sold_count=500, is_active=True)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+def add_post(product, **values):
+    post = Post(product_id=product.id, platform='twitter', content='Fone', status='scheduled', **values)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+def cooldown_of(product):
+    return ProductRotation.query.filter_by(platform='twitter', product_id=product.id).one().cooldown_until
+
+def test_post_scheduled_ahead_rests_the_product_from_its_scheduled_time(app_context):
+    product = add_product('ahead')
+    rotation_service.refill()
+    next_week = datetime.utcnow() + timedelta(days=7)
+    
+    add_post(product, scheduled_time=next_week)
+    rotation_service.refill()
+    
+    assert cooldown_of(product) == next_week + ROTATION_COOLDOWN
+
+def test_post_committed_after_a_higher_id_is_still_applied(app_context):
+    late, early = add_product('late'), add_product('early')
+    rotation_service.refill()
+    now = datetime.utcnow()
+    
+    # Id 1 was taken first, but its transaction commits after a refill read past id 2
+    add_post(early, id=2, scheduled_time=now, created_at=now)
+    rotation_service.refill()
+    add_post(late, id=1, scheduled_time=now, created_at=now)
+    rotation_service.refill()
+    
+    assert cooldown_of(late) == now + ROTATION_COOLDOWN
@@ -0,0 +1,22 @@
+from app import db
+from models import AffiliateConfig, Product
+from services.shopee_service import ShopeeService
+
+def configure_affiliate_id(affiliate_id):
+    config = AffiliateConfig.query.first() or AffiliateConfig(base_affiliate_url='https://shopee.com.br')
+    config.affiliate_id = affiliate_id
+    db.session.add(config)
+    db.session.commit()
+
+def test_products_stored_after_a_settings_change_use_the_new_affiliate_id(app_context, monkeypatch):
+    monkeypatch.delenv('SHOPEE_AFFILIATE_ID', raising=False)
+    shopee_service = ShopeeService()
+    configure_affiliate_id('old')
+    assert shopee_service.get_affiliate_id() == 'old'
+    
+    # Changed by another process, whose relink ran before this batch is stored
+    configure_affiliate_id('new')
+    shopee_service.store_api_items([{'item_id': 42, 'item_name': 'Fone', 'price_info': {'current_price': 1000000}}])
+    db.session.commit()
+    
+    assert Product.query.filter_by(shopee_id='42').one().affiliate_link.endswith('?af=new&pid=partner&c=affiliate')
@@ -0,0 +1,21 @@
+from app import db
+from models import Post, Product, SocialMediaAccount
+from services.social_client_registry import social_client_registry
+from services.social_media_service import SocialMediaService
+
+def test_platform_error_with_credentials_is_recorded_as_a_failure(app_context, monkeypatch):
+    def run(platform, account, call):
+        raise ConnectionError("Twitter is down")
+    
+    monkeypatch.setattr(social_client_registry, 'has_credentials', lambda platform: True)
+    monkeypatch.setattr(social_client_registry, 'run', run)
+    product = Product(shopee_id='tweet-1', title='Fone', price=10.0)
+    account = SocialMediaAccount(platform='twitter', username='achadinhos', is_active=True)
+    db.session.add_all([product, account])
+    db.session.flush()
+    post = Post(product_id=product.id, platform='twitter', content='Fone', status='publishing')
+    db.session.add(post)
+    db.session.flush()
+    
+    assert SocialMediaService().publish_post(post, account) is False
+    assert (post.status, post.attempts) == ('failed', 1)